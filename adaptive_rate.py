@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""BERR EXO — Adaptive control rate.
+
+A fixed dt caps fast movements at 1/dt. AdaptiveRate picks the next tick
+period from how fast the torque demand is changing: the curve gradient at the
+current position times the velocity (Nm/s), plus the angular speed itself.
+Each tick is sized so neither the demanded torque nor the position moves more
+than a fixed step; the result is clamped to [dt_min, dt_max]. The rate jumps
+up immediately when motion starts and backs off gradually when it stops.
+backend.py still polls the encoder and commands torque at least every fixed
+dt; a period above dt only spaces out the telemetry reads, log rows and
+UI/tap frames, so at rest USB traffic and log size drop to 1/dt_max without
+the position going stale at motion onset.
+
+rate_report() compares the samples a session actually wrote against a
+fixed-rate baseline at the configured dt:
+
+    python adaptive_rate.py frontend/logs/berr_exo_log_20260225_131340.csv
+"""
+
+import argparse
+from typing import Optional
+
+import numpy as np
+
+from session_log import SessionRef, add_session_args, select_sessions
+
+MOVING_DEG_S = 5.0  # |velocity| above this counts as motion in the report
+
+
+class AdaptiveRate:
+    """Chooses the next control period from velocity and curve gradient."""
+
+    def __init__(self, dt_min: float = 0.002, dt_max: float = 0.1,
+                 torque_step: float = 0.01, pos_step_deg: float = 0.5, release: float = 1.25):
+        self.dt_min = dt_min
+        self.dt_max = dt_max
+        self.torque_step = torque_step    # Nm of demanded-torque change allowed per tick
+        self.pos_step_deg = pos_step_deg  # degrees of travel allowed per tick
+        self.release = release            # max period growth per tick when slowing down
+        self.dt = dt_min
+
+    def next_period(self, vel: float, gradient: float, max_torque: float, pos_range: float,
+                    ramping: bool = False) -> float:
+        """Period (s) until the next tick.
+
+        vel is in turns/s, gradient is d(curve)/d(normalized position) at the
+        current lookup, pos_range in turns. `ramping` (slew limiter not yet at
+        the desired torque) keeps the rate up until the ramp completes.
+        """
+        torque_rate = abs(max_torque * gradient * vel / pos_range)
+        deg_rate = abs(vel) * 360.0
+        target = self.dt_max
+        if torque_rate > 0:
+            target = min(target, self.torque_step / torque_rate)
+        if deg_rate > 0:
+            target = min(target, self.pos_step_deg / deg_rate)
+        if ramping:
+            target = self.dt_min
+        target = max(self.dt_min, target)
+        # Fast attack, slow release
+        self.dt = target if target < self.dt else min(target, self.dt * self.release)
+        return self.dt
+
+
+def curve_gradient(evaluate, curve, x: float, h: float = 0.01) -> float:
+    """Central-difference slope of evaluate(curve, x), one-sided at the ends."""
+    lo, hi = max(0.0, x - h), min(1.0, x + h)
+    return (evaluate(curve, hi) - evaluate(curve, lo)) / (hi - lo)
+
+
+# ── Samples vs Fixed-Rate Baseline ──────────────────────────────────────────
+
+def rate_report(session: SessionRef) -> Optional[dict]:
+    """Samples written vs a fixed-rate log at the session's dt, split by motion/rest."""
+    rows = session.read_rows()
+    meta = session.read_meta() or {}
+    if len(rows) < 2:
+        return None
+    t = np.array([float(r["time_s"]) for r in rows])
+    vel = np.array([abs(float(r["velocity_turns_s"])) * 360.0 for r in rows])
+    dt = float(meta.get("dt_s", 0.02))
+    duration = float(t[-1] - t[0])
+    intervals = np.diff(t)
+    moving = vel[1:] >= MOVING_DEG_S
+
+    def rate_hz(mask):
+        iv = intervals[mask]
+        return float(len(iv) / iv.sum()) if len(iv) and iv.sum() > 0 else 0.0
+
+    baseline = int(duration / dt) + 1
+    return {
+        "session": session.name,
+        "adaptive": bool(meta.get("adaptive", False)),
+        "duration_s": duration,
+        "samples": len(rows),
+        "baseline_samples": baseline,
+        "ratio": len(rows) / baseline,
+        "moving_share": float(intervals[moving].sum() / duration) if duration > 0 else 0.0,
+        "moving_rate_hz": rate_hz(moving),
+        "rest_rate_hz": rate_hz(~moving),
+        "baseline_rate_hz": 1.0 / dt,
+        "max_interval_ms": float(intervals.max() * 1000) if len(intervals) else 0.0,
+    }
+
+
+def format_rate_report(r: dict) -> str:
+    return (f"Samples: {r['samples']} vs {r['baseline_samples']} at fixed "
+            f"{r['baseline_rate_hz']:.0f} Hz ({r['ratio']:.0%}) | "
+            f"moving {r['moving_share']:.0%} of {r['duration_s']:.0f} s at {r['moving_rate_hz']:.0f} Hz, "
+            f"resting at {r['rest_rate_hz']:.0f} Hz | longest gap {r['max_interval_ms']:.0f} ms")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Samples written vs a fixed-rate baseline")
+    add_session_args(p)
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sessions = select_sessions(args)
+    for s in sessions:
+        try:
+            r = rate_report(s)
+        except (KeyError, ValueError):
+            r = None
+        if r is None:
+            print(f"{s.name}: skipped (too short or missing columns)")
+        else:
+            print(f"{s.name}: {'[adaptive] ' if r['adaptive'] else '[fixed] '}{format_rate_report(r)}")
+
+
+if __name__ == "__main__":
+    main()
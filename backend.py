@@ -1,16 +1,27 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
-import csv
 import websockets
 import json
 import math
+import signal
+import sys
 import time
 from datetime import datetime
-from pathlib import Path
 
 import odrive
 from odrive.enums import AxisState, ControlMode, InputMode
 
+from adaptive_rate import AdaptiveRate, curve_gradient, format_rate_report, rate_report
+from history import SessionHistory
+from prediction import PositionPredictor, format_report, tracking_report
+from replay import Replay
+from http_server import missing_vendor_assets, process_request, vendor_assets
+from progress_store import DEFAULT_PATIENT, ProgressStore
+from session_log import BACKEND_LOG_DIR, SessionLogWriter, session_for_path
+from telemetry_tap import DEFAULT_NAME as DEFAULT_TAP_NAME, TelemetryTap
+from thermal_model import DEFAULT_C_TH, DEFAULT_R_TH, MotorThermalModel, phase_current
+
 # ── Interpolation Math ──
 def catmull_rom(p0, p1, p2, p3, t):
     t2 = t * t
@@ -33,14 +44,87 @@ def evaluate_curve(curve, normalized_pos):
     p3 = curve[min(n - 1, i + 2)]
     return catmull_rom(p0, p1, p2, p3, frac)
 
+# ── Deadline Watchdog ──
+class DeadlineWatchdog:
+    """Tracks control-tick latency and forces torque to zero when a deadline is missed.
+
+    tick() is called at the top of every control iteration. guard() runs as a
+    separate task and catches stalls while the loop is parked in an await
+    (e.g. a slow websocket.send). Stalls inside blocking USB calls freeze the
+    event loop too; those are covered by the device-side watchdog timer.
+    """
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.misses = 0
+        self.worst = 0.0
+        self.last = time.perf_counter()
+        self.tripped = False
+
+    def tick(self):
+        """Return (latency_s, late) for the tick that is starting now."""
+        now = time.perf_counter()
+        latency = now - self.last
+        self.last = now
+        self.worst = max(self.worst, latency)
+        late = latency > self.deadline
+        if late and not self.tripped:
+            self._trip(latency)
+        late = late or self.tripped
+        self.tripped = False
+        return latency, late
+
+    async def guard(self):
+        while SESSION_ACTIVE:
+            await asyncio.sleep(self.deadline / 2)
+            stalled = time.perf_counter() - self.last
+            if not self.tripped and stalled > self.deadline:
+                self.tripped = True
+                self._trip(stalled)
+
+    def _trip(self, latency):
+        self.misses += 1
+        try:
+            AXIS.controller.input_torque = 0
+        except Exception as e:
+            print(f"Watchdog failed to zero torque: {e}")
+        print(f"Deadline miss #{self.misses}: tick took {latency * 1000:.1f} ms "
+              f"(deadline {self.deadline * 1000:.0f} ms) - torque zeroed")
+
 # ── Global State ──
 ODRV = None
 AXIS = None
 SESSION_ACTIVE = False
+HISTORY = SessionHistory()  # active (or most recent) session, served to charts on request
+TAP = None  # shared-memory telemetry ring for external readers (telemetry_tap.py)
+CLIENTS = set()  # every connected UI websocket
+MAX_CLIENT_BUFFER = 256 * 1024  # bytes queued for one client before its telemetry frames are dropped
+FANOUT = {"sent": 0, "dropped": 0}
+REPLAY = None  # set by --replay: sessions stream from a log instead of the ODrive
+TRANSPORT = "usb"  # link to the device, recorded in session metadata ("sim" with --simulate)
+LOG_COMPRESSION = None  # --log-compression: session log default when the UI config doesn't set one
+
+# ── Telemetry Fan-Out ──
+def fan_out(message):
+    """Send to every client without awaiting; clients that can't keep up lose frames.
+
+    The control loop must never wait on a socket, so a stalled or slow
+    dashboard only affects itself: once its unsent backlog passes
+    MAX_CLIENT_BUFFER, frames for it are dropped until it drains.
+    """
+    ready = []
+    for client in CLIENTS:
+        transport = client.transport
+        if transport is not None and transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            FANOUT["dropped"] += 1
+        else:
+            ready.append(client)
+    websockets.broadcast(ready, message)
+    FANOUT["sent"] += len(ready)
 
 # ── Async Control Loop ──
 async def run_session(websocket, config):
-    global SESSION_ACTIVE, ODRV, AXIS
+    global SESSION_ACTIVE, ODRV, AXIS, HISTORY
     
     # Extract UI Config
     curve = config.get("curve", [0.8]*12)
@@ -48,36 +132,94 @@ async def run_session(websocket, config):
     slew_rate = float(config.get("slew_rate", 5.0))
     pos_range_deg = float(config.get("rom", 120.0))
     dt = float(config.get("dt", 0.02))
+    deadline = float(config.get("deadline", 3 * dt))
+    watchdog_timeout = float(config.get("watchdog_timeout", 0.2))
+    log_compression = config.get("log_compression", LOG_COMPRESSION)  # None, "gzip" or "zstd"
+    patient = str(config.get("patient") or DEFAULT_PATIENT)
+    predict = bool(config.get("predict", False))
+    predict_horizon = float(config.get("predict_horizon", 0.05))
+    transport_delay = float(config.get("transport_delay", 0.0))
+    # "curve": host computes torque every tick. "hybrid": the ODrive velocity loop
+    # (integrator off, input_vel = 0) supplies viscous damping at the controller
+    # rate; the host only schedules vel_gain and a torque feedforward from the curve.
+    mode = config.get("mode", "curve")
+    hybrid = mode == "hybrid"
+    damping = float(config.get("damping", 0.5))  # peak vel_gain, (Nm·s)/turn
+    gain_period = 1.0 / float(config.get("gain_rate_hz", 10.0))
+    # Adaptive rate: the sample period follows velocity and curve gradient within [dt_min, dt_max].
+    # The encoder is still polled and the torque commanded at least every dt, so the position
+    # is never stale at motion onset and the deadline stays put; periods above dt only space
+    # out the telemetry reads, log rows and UI/tap frames. dt stays the UI telemetry period
+    # and the fixed-rate baseline for the report.
+    adaptive = bool(config.get("adaptive", False))
+    dt_max = max(float(config.get("dt_max", 0.1)), dt)
+    dt_min = min(float(config.get("dt_min", 0.002)), dt)
+    planned_duration = float(config.get("planned_duration", 1200.0))  # s, horizon for the thermal budget
+    # Thermal derating is opt-in until R_th / C_th are identified on the motor; the model
+    # still runs (telemetry, log) either way
+    thermal_budget = bool(config.get("thermal_budget", False))
+    thermal_calibrated = "thermal_r_th" in config and "thermal_c_th" in config
 
     # Setup ODrive for Session
-    print("Configuring ODrive for session...")
+    print(f"Configuring ODrive for {mode} session...")
     ODRV.clear_errors()
-    AXIS.controller.config.control_mode = ControlMode.TORQUE_CONTROL
+    saved_vel_gains = None
+    if hybrid:
+        saved_vel_gains = (AXIS.controller.config.vel_gain, AXIS.controller.config.vel_integrator_gain)
+        AXIS.controller.config.control_mode = ControlMode.VELOCITY_CONTROL
+        AXIS.controller.config.vel_integrator_gain = 0  # Zero = no spring-back
+        AXIS.controller.config.vel_gain = 0
+        AXIS.controller.input_vel = 0
+    else:
+        AXIS.controller.config.control_mode = ControlMode.TORQUE_CONTROL
     AXIS.controller.config.input_mode = InputMode.PASSTHROUGH
     AXIS.controller.input_torque = 0
+
+    AXIS.config.enable_watchdog = False
     AXIS.requested_state = AxisState.CLOSED_LOOP_CONTROL
-    
+
     await asyncio.sleep(0.3) # Give it a moment to enter closed loop
 
     if AXIS.current_state != AxisState.CLOSED_LOOP_CONTROL:
+        restore_control_mode(saved_vel_gains)
         await websocket.send(json.dumps({"type": "error", "message": "Failed to enter closed-loop control."}))
         SESSION_ACTIVE = False
         return
 
+    # Arm the device-side watchdog only once in closed loop (the 0.3 s wait above is longer
+    # than the timeout); from here the control loop feeds it every tick, and a host stall
+    # disarms the axis in hardware
+    AXIS.config.watchdog_timeout = watchdog_timeout
+    AXIS.watchdog_feed()
+    AXIS.config.enable_watchdog = True
+
     # Auto-Zero position based on current physical location
     pos_start = AXIS.pos_vel_mapper.pos_rel
     pos_range = pos_range_deg / 360.0
     current_torque = 0.0
+    vel_gain = 0.0
+    thermal = MotorThermalModel(
+        AXIS.config.motor.phase_resistance, AXIS.config.motor.torque_constant,
+        limit_C=AXIS.motor.motor_thermistor.config.temp_limit_lower,
+        ambient_C=float(config.get("ambient_temp", 25.0)),
+        r_th=float(config.get("thermal_r_th", DEFAULT_R_TH)),
+        c_th=float(config.get("thermal_c_th", DEFAULT_C_TH)),
+    )
+    thermal_scale = 1.0
+    last_gain_update = -gain_period
 
     print(f"Session started! Start Pos: {pos_start:.3f} turns. Range: {pos_range_deg} deg.")
 
-    t_start = time.time()
+    t_start = time.perf_counter()
+    HISTORY = SessionHistory()
+    if TAP is not None:
+        TAP.new_session()
 
     # CSV logging setup
-    log_dir = Path("frontend/logs")
+    log_dir = BACKEND_LOG_DIR
     log_dir.mkdir(parents=True, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    csv_path = log_dir / f"berr_exo_log_{timestamp}.csv"
+    csv_path = log_dir / f"berr_exo_log_{timestamp}.csv"  # + .gz/.zst when compressed
     meta_path = log_dir / f"berr_exo_log_{timestamp}_meta.json"
 
     with open(meta_path, "w") as mf:
@@ -87,11 +229,31 @@ async def run_session(websocket, config):
             "slew_rate_Nm_s": slew_rate,
             "pos_range_deg": pos_range_deg,
             "dt_s": dt,
+            "transport": TRANSPORT,
+            "deadline_s": deadline,
+            "watchdog_timeout_s": watchdog_timeout,
             "pos_start_turns": pos_start,
+            "patient": patient,
+            "predict": predict,
+            "predict_horizon_s": predict_horizon,
+            "transport_delay_s": transport_delay,
+            "mode": mode,
+            "damping_Nms_turn": damping if hybrid else None,
+            "gain_rate_hz": 1.0 / gain_period if hybrid else None,
+            "adaptive": adaptive,
+            "dt_min_s": dt_min if adaptive else None,
+            "dt_max_s": dt_max if adaptive else None,
+            "planned_duration_s": planned_duration,
+            "thermal_budget": thermal_budget,
+            "thermal_limit_C": thermal.limit,
+            "thermal_r_th_K_W": thermal.r_th,
+            "thermal_c_th_J_K": thermal.c_th,
+            "thermal_params_source": "config" if thermal_calibrated else "default (uncalibrated)",
+            "thermal_current_source": "torque_estimate / torque_constant",
         }, mf, indent=2)
 
-    csvfile = open(csv_path, "w", newline="")
-    writer = csv.writer(csvfile)
+    writer = SessionLogWriter(csv_path, log_compression)
+    csv_path = writer.path
     writer.writerow([
         "time_s", "pos_turns", "pos_deg", "normalized",
         "velocity_turns_s", "curve_multiplier",
@@ -101,30 +263,76 @@ async def run_session(websocket, config):
         "vbus_V", "ibus_A",
         "power_elec_W", "power_mech_W",
         "active_errors",
+        "tick_ms", "deadline_misses",
+        "horizon_ms", "predicted_deg",
+        "vel_gain", "rate_hz",
+        "model_temp_C", "thermal_scale", "time_to_limit_s", "sustainable_torque_Nm",
     ])
     print(f"Logging to: {csv_path}")
 
+    FANOUT.update(sent=0, dropped=0)
+    watchdog = DeadlineWatchdog(deadline)
+    predictor = PositionPredictor(predict_horizon, transport_delay)
+    rate = AdaptiveRate(dt_min, dt_max)
+    period = dt
+    last_send = -dt
+    last_sample = None  # t_now of the last full sample (telemetry read + log row)
+    guard_task = asyncio.create_task(watchdog.guard())
+
     try:
         while SESSION_ACTIVE:
-            t_now = time.time() - t_start
+            tick_latency, late = watchdog.tick()
+            AXIS.watchdog_feed()
+            if late:
+                current_torque = 0.0  # ramp back in from zero after a stall
+
+            t_read = time.perf_counter()
             pos = AXIS.pos_vel_mapper.pos_rel
             vel = AXIS.pos_vel_mapper.vel
+            t_sample = 0.5 * (t_read + time.perf_counter())
+            t_now = t_sample - t_start  # logged timestamp = when the position was sampled
+            predictor.update_period(tick_latency)
 
             # Normalize position
             normalized = (pos - pos_start) / pos_range
             normalized = max(0.0, min(1.0, normalized))
 
-            # Evaluate curve & Torque Slew Limiting
-            curve_mult = evaluate_curve(curve, normalized)
-            desired = max_torque * curve_mult
+            # Latency compensation: look the curve up where the arm will be when the torque lands.
+            # The prediction is logged either way so tracking_report() can compare both.
+            pos_pred, horizon = predictor.predict(pos, vel, t_sample, time.perf_counter())
+            if predict:
+                lookup = max(0.0, min(1.0, (pos_pred - pos_start) / pos_range))
+            else:
+                lookup = normalized
+
+            # Evaluate curve & Torque Slew Limiting (thermal budget scales the whole curve)
+            curve_mult = evaluate_curve(curve, lookup)
+            desired = max_torque * curve_mult * thermal_scale
 
-            max_change = slew_rate * dt
+            max_change = slew_rate * (min(tick_latency, dt) if adaptive else dt)
             if desired > current_torque:
                 current_torque = min(desired, current_torque + max_change)
             else:
                 current_torque = max(desired, current_torque - max_change)
 
-            AXIS.controller.input_torque = current_torque
+            if not hybrid:
+                AXIS.controller.input_torque = current_torque
+            elif late or t_now - last_gain_update >= gain_period:
+                # Slow gain schedule: damping and feedforward both follow the curve
+                vel_gain = damping * curve_mult * thermal_scale
+                AXIS.controller.config.vel_gain = vel_gain
+                AXIS.controller.input_torque = current_torque
+                last_gain_update = t_now
+
+            if adaptive:
+                period = rate.next_period(vel, curve_gradient(evaluate_curve, curve, lookup),
+                                          max_torque, pos_range, ramping=current_torque != desired)
+                if last_sample is not None and t_now - last_sample < period:
+                    # Control-only tick: at rest the full sample below runs every period, not every dt
+                    await asyncio.sleep(max(0.0, min(period, dt) - (time.perf_counter() - watchdog.last)))
+                    continue
+            sample_dt = tick_latency if last_sample is None else t_now - last_sample
+            last_sample = t_now
 
             # Fetch Telemetry
             motor_temp = AXIS.motor.motor_thermistor.temperature
@@ -137,9 +345,20 @@ async def run_session(websocket, config):
             power_mech = AXIS.motor.mechanical_power
             errors = AXIS.active_errors
 
+            # Thermal budget: derate ahead of the limit, applied from the next tick through the slew limiter.
+            # input_iq is the setpoint input (0 in torque control); heat from the measured torque instead.
+            thermal.update(phase_current(torque_est, thermal.kt), motor_temp, min(sample_dt, 1.0),
+                           abs(max_torque) * thermal_scale)
+            remaining = planned_duration - t_now
+            sustainable = thermal.sustainable_torque(remaining)
+            time_to_limit = thermal.time_to_limit()
+            if thermal_budget:
+                # Low-pass (~2 s) so hybrid vel_gain, which bypasses the slew limiter, changes smoothly too
+                thermal_scale += min(1.0, sample_dt / 2.0) * (thermal.budget(max_torque, remaining) - thermal_scale)
+
             # Write CSV row
             writer.writerow([
-                f"{t_now:.3f}", f"{pos:.5f}",
+                f"{t_now:.4f}", f"{pos:.5f}",
                 f"{(pos - pos_start) * 360:.1f}", f"{normalized:.3f}",
                 f"{vel:.3f}", f"{curve_mult:.4f}",
                 f"{current_torque:.4f}", f"{desired:.4f}",
@@ -148,47 +367,166 @@ async def run_session(websocket, config):
                 f"{vbus:.2f}", f"{ibus:.3f}",
                 f"{power_elec:.2f}", f"{power_mech:.2f}",
                 f"{errors}",
+                f"{tick_latency * 1000:.2f}", f"{watchdog.misses}",
+                f"{horizon * 1000:.2f}", f"{(pos_pred - pos_start) * 360:.1f}",
+                f"{vel_gain:.4f}", f"{1.0 / period:.1f}",
+                f"{thermal.temp:.2f}", f"{thermal_scale:.3f}",
+                f"{min(time_to_limit, 1e6):.0f}", f"{min(sustainable, 1e3):.3f}",
             ])
 
-            # Send Telemetry to UI
-            telemetry = {
-                "type": "telemetry",
-                "torque": round(current_torque, 2),
-                "torque_estimate": round(torque_est, 2),
-                "pos_deg": round((pos - pos_start) * 360, 1),
-                "vel": round(vel, 2),
-                "current": round(input_iq, 2),
-                "motor_temp": round(motor_temp, 1),
-                "fet_temp": round(fet_temp, 1),
-                "power": round(vbus * ibus, 1),
-                "power_elec": round(power_elec, 1),
-                "power_mech": round(power_mech, 1),
-                "vbus": round(vbus, 1),
-                "curve_mult": round(curve_mult, 2),
-                "active_errors": errors,
-                "time": round(t_now, 1),
-            }
-            await websocket.send(json.dumps(telemetry))
+            if TAP is not None:
+                TAP.publish(
+                    errors, time_s=t_now, pos_turns=pos, pos_deg=(pos - pos_start) * 360,
+                    normalized=normalized, velocity_turns_s=vel, curve_multiplier=curve_mult,
+                    commanded_torque_Nm=current_torque, desired_torque_Nm=desired,
+                    torque_estimate_Nm=torque_est, input_iq_A=input_iq,
+                    motor_temp_C=motor_temp, fet_temp_C=fet_temp, vbus_V=vbus, ibus_A=ibus,
+                    power_elec_W=power_elec, power_mech_W=power_mech,
+                    tick_ms=tick_latency * 1000, deadline_misses=watchdog.misses,
+                )
+            HISTORY.append(t_now, torque=current_torque, torque_estimate=torque_est,
+                           pos_deg=(pos - pos_start) * 360)
+
+            # Send Telemetry to UI (at most every dt when the control rate is adaptive)
+            if not adaptive or t_now - last_send >= dt:
+                last_send = t_now
+                telemetry = {
+                    "type": "telemetry",
+                    "torque": round(current_torque, 2),
+                    "torque_estimate": round(torque_est, 2),
+                    "pos_deg": round((pos - pos_start) * 360, 1),
+                    "vel": round(vel, 2),
+                    "current": round(input_iq, 2),
+                    "motor_temp": round(motor_temp, 1),
+                    "fet_temp": round(fet_temp, 1),
+                    "power": round(vbus * ibus, 1),
+                    "power_elec": round(power_elec, 1),
+                    "power_mech": round(power_mech, 1),
+                    "vbus": round(vbus, 1),
+                    "curve_mult": round(curve_mult, 2),
+                    "vel_gain": round(vel_gain, 3),
+                    "active_errors": errors,
+                    "tick_ms": round(tick_latency * 1000, 1),
+                    "deadline_misses": watchdog.misses,
+                    "rate_hz": round(1.0 / period),
+                    "thermal": {
+                        "model_temp": round(thermal.temp, 1),
+                        "limit": thermal.limit,
+                        "scale": round(thermal_scale, 3),
+                        "enabled": thermal_budget,
+                        "time_to_limit": None if math.isinf(time_to_limit) else round(time_to_limit),
+                        "sustainable": round(min(sustainable, 99.0), 2),
+                    },
+                    "time": round(t_now, 3),
+                    "ts": round(time.time(), 4),  # wall clock at send, for end-to-end latency
+                }
+                fan_out(json.dumps(telemetry))
 
             # Yield control back to the event loop so the server can receive incoming messages (like "stop")
-            await asyncio.sleep(dt)
+            if adaptive:
+                await asyncio.sleep(max(0.0, min(period, dt) - (time.perf_counter() - watchdog.last)))
+            else:
+                await asyncio.sleep(dt)
 
     except Exception as e:
         print(f"Session Error: {e}")
     finally:
         print("Session Ended. Disarming...")
-        csvfile.close()
+        writer.close()
         AXIS.controller.input_torque = 0
         AXIS.requested_state = AxisState.IDLE
+        AXIS.config.enable_watchdog = False
+        restore_control_mode(saved_vel_gains)
         SESSION_ACTIVE = False
-        await websocket.send(json.dumps({"type": "status", "message": "stopped"}))
+        guard_task.cancel()
+        print(f"Deadline misses: {watchdog.misses} | Worst tick: {watchdog.worst * 1000:.1f} ms")
+        print(f"Telemetry fan-out: {FANOUT['sent']} sent, {FANOUT['dropped']} dropped (slow clients)")
+        fan_out(json.dumps({"type": "status", "message": "stopped"}))
         print(f"Log saved: {csv_path}")
+        try:
+            await asyncio.to_thread(ingest_session, csv_path)
+        except Exception as e:
+            print(f"Progress store ingest failed: {e}")
+        try:
+            report = await asyncio.to_thread(tracking_report, session_for_path(csv_path), predict_horizon)
+            if report is not None:
+                print(("[predict on] " if predict else "[predict off] ") + format_report(report))
+        except Exception as e:
+            print(f"Tracking report failed: {e}")
+        try:
+            report = await asyncio.to_thread(rate_report, session_for_path(csv_path))
+            if report is not None:
+                print(("[adaptive] " if adaptive else "[fixed] ") + format_rate_report(report))
+        except Exception as e:
+            print(f"Rate report failed: {e}")
+
+def restore_control_mode(saved_vel_gains):
+    """Undo hybrid-mode changes: torque control and the original velocity gains."""
+    if saved_vel_gains is None:
+        return
+    AXIS.controller.config.control_mode = ControlMode.TORQUE_CONTROL
+    AXIS.controller.config.vel_gain, AXIS.controller.config.vel_integrator_gain = saved_vel_gains
+    AXIS.controller.input_vel = 0
+
+# ── Progress Store ──
+def ingest_session(csv_path):
+    store = ProgressStore()
+    try:
+        if store.ingest(session_for_path(csv_path)):
+            print(f"Progress store updated: {csv_path.name}")
+    finally:
+        store.close()
+
+def backfill_progress(started):
+    """Ingest sessions logged before this backend started (e.g. a fresh store, or tester.py runs)."""
+    store = ProgressStore()
+    try:
+        added = store.ingest_dirs(before=started)
+        if added:
+            print(f"Progress store backfilled {added} session(s)")
+    finally:
+        store.close()
+
+async def backfill_progress_task(started):
+    try:
+        await asyncio.to_thread(backfill_progress, started)
+    except Exception as e:
+        print(f"Progress store backfill failed: {e}")
+
+def query_trend(patient, period):
+    store = ProgressStore(read_only=True)
+    try:
+        return store.trend(patient, period)
+    finally:
+        store.close()
+
+# ── Replay Session ──
+async def run_replay():
+    global SESSION_ACTIVE, HISTORY
+    HISTORY = SessionHistory()
+
+    def record(t, row):
+        HISTORY.append(t, torque=float(row["commanded_torque_Nm"]),
+                       torque_estimate=float(row["torque_estimate_Nm"]), pos_deg=float(row["pos_deg"]))
+
+    try:
+        await REPLAY.stream(CLIENTS, lambda: SESSION_ACTIVE, record)
+    except Exception as e:
+        print(f"Replay Error: {e}")
+    finally:
+        SESSION_ACTIVE = False
 
 # ── WebSocket Server Router ──
 async def ws_handler(websocket):
-    global SESSION_ACTIVE
     print("UI Client Connected")
-    
+    CLIENTS.add(websocket)
+    try:
+        await handle_messages(websocket)
+    finally:
+        CLIENTS.discard(websocket)
+
+async def handle_messages(websocket):
+    global SESSION_ACTIVE
     async for message in websocket:
         data = json.loads(message)
         cmd = data.get("command")
@@ -196,22 +534,110 @@ async def ws_handler(websocket):
         if cmd == "start":
             if not SESSION_ACTIVE:
                 SESSION_ACTIVE = True
-                asyncio.create_task(run_session(websocket, data.get("config", {})))
+                if REPLAY is not None:
+                    asyncio.create_task(run_replay())
+                else:
+                    asyncio.create_task(run_session(websocket, data.get("config", {})))
         
         elif cmd == "stop":
             print("Stop command received from UI")
             SESSION_ACTIVE = False
 
-async def main():
-    print("Starting WebSocket Server on ws://localhost:8765")
-    async with websockets.serve(ws_handler, "localhost", 8765):
+        elif cmd == "history":
+            # Downsampled chart data for [t1 - window, t1]; window=None means whole session
+            t1 = data.get("t1")
+            window = data.get("window")
+            t0 = data.get("t0")
+            if window is not None and HISTORY.t:
+                t0 = (HISTORY.t[-1] if t1 is None else t1) - float(window)
+            reply = HISTORY.query(t0, t1, int(data.get("points", 600)))
+            reply.update({"type": "history", "active": SESSION_ACTIVE, "view": data.get("view")})
+            await websocket.send(json.dumps(reply))
+
+        elif cmd == "trends":
+            try:
+                reply = await asyncio.to_thread(query_trend, str(data.get("patient") or DEFAULT_PATIENT),
+                                                data.get("period", "week"))
+                reply["type"] = "trends"
+            except ValueError as e:
+                reply = {"type": "error", "message": str(e)}
+            await websocket.send(json.dumps(reply))
+
+async def main(port=8765):
+    print(f"Starting WebSocket Server on ws://localhost:{port}")
+    print(f"Serving frontend on http://localhost:{port}/")
+    missing = missing_vendor_assets()
+    if missing:
+        print(f"WARNING: frontend/vendor/ is missing {', '.join(missing)}; the UI will run without charts. "
+              f"Install with `python backend.py --vendor-assets [DIR]`.")
+    # Session names carry whole seconds; anything from this second on is left to ingest_session.
+    # The reference keeps the task alive while the server runs.
+    backfill = asyncio.create_task(backfill_progress_task(datetime.now().replace(microsecond=0)))
+    async with websockets.serve(ws_handler, "localhost", port, process_request=process_request):
         await asyncio.Future()  # run forever
 
+def parse_args():
+    p = argparse.ArgumentParser(description="BERR EXO — WebSocket backend")
+    p.add_argument("--replay", type=str, default=None,
+                   help="Stream a logged session CSV (.csv/.gz/.zst) instead of driving the ODrive")
+    p.add_argument("--speed", type=float, default=1.0,
+                   help="Replay speed multiplier, 0 = as fast as possible (default: 1.0)")
+    p.add_argument("--loop", action="store_true",
+                   help="Restart the replay from the beginning until stopped")
+    p.add_argument("--simulate", action="store_true",
+                   help="Drive a simulated ODrive and arm (sim_device.py) instead of real hardware")
+    p.add_argument("--seed", type=int, default=0,
+                   help="Random seed for --simulate (default: 0)")
+    p.add_argument("--port", type=int, default=8765,
+                   help="WebSocket/HTTP port (default: 8765)")
+    p.add_argument("--log-compression", type=str, default=None, choices=["gzip", "zstd"],
+                   help="Write session CSV logs compressed (default: plain CSV)")
+    p.add_argument("--tap-name", type=str, default=DEFAULT_TAP_NAME,
+                   help=f"Shared-memory name of the telemetry tap (default: {DEFAULT_TAP_NAME})")
+    p.add_argument("--no-tap", action="store_true",
+                   help="Don't publish the shared-memory telemetry tap")
+    p.add_argument("--vendor-assets", nargs="?", const=True, default=None, metavar="DIR",
+                   help="Install pinned frontend assets into frontend/vendor/ and exit "
+                        "(from DIR if given, e.g. copied from a machine with internet; else downloaded)")
+    return p.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    LOG_COMPRESSION = args.log_compression
+    if args.vendor_assets:
+        try:
+            vendor_assets(None if args.vendor_assets is True else args.vendor_assets)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: could not install frontend assets: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
+    if hasattr(asyncio, 'WindowsSelectorEventLoopPolicy'):
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    # SIGTERM (e.g. from loadgen.py) unwinds like Ctrl+C: an active session disarms and the tap is unlinked
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    if args.replay:
+        # REPLAY MODE: no ODrive, "start" streams the log to every connected client
+        try:
+            REPLAY = Replay(args.replay, speed=args.speed, loop=args.loop)
+        except (OSError, ValueError) as e:
+            print(f"Cannot replay {args.replay}: {e}")
+            sys.exit(1)
+        asyncio.run(main(args.port))
+        sys.exit(0)
+
     # PRE-SESSION SETUP: Connect to ODrive BEFORE starting the asyncio loop
     print("Connecting to ODrive... (Pre-session setup)")
     try:
-        ODRV = odrive.find_any(timeout=10.0)
+        if args.simulate:
+            from sim_device import SimulatedODrive
+            ODRV = SimulatedODrive(seed=args.seed)
+            TRANSPORT = "sim"
+            print("Using simulated ODrive (sim_device.py)")
+        else:
+            ODRV = odrive.find_any(timeout=10.0)
         if ODRV is None:
             print("Timeout finding ODrive. Is it plugged in and powered?")
             exit(1)
@@ -219,10 +645,18 @@ if __name__ == "__main__":
         AXIS = ODRV.axis0
         print(f"ODrive Connected successfully! VBUS: {ODRV.vbus_voltage:.2f}V")
         
+        if not args.no_tap:
+            try:
+                TAP = TelemetryTap(args.tap_name)
+                print(f"Telemetry tap: shared memory '{TAP.name}' ({TAP.capacity} records)")
+            except OSError as e:
+                print(f"Telemetry tap unavailable: {e}")
+
         # Now that ODrive is connected, start the WebSocket server
-        if hasattr(asyncio, 'WindowsSelectorEventLoopPolicy'):
-            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-        asyncio.run(main())
+        asyncio.run(main(args.port))
         
     except Exception as e:
-        print(f"Startup Failed: {e}")
\ No newline at end of file
+        print(f"Startup Failed: {e}")
+    finally:
+        if TAP is not None:
+            TAP.close()
\ No newline at end of file
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""BERR EXO — Fit torque curves to recorded sessions.
+
+Catmull-Rom evaluation (evaluate_curve) is linear in the control points, so a
+curve of N points evaluated at a set of positions is just B @ c with B a
+basis matrix. That turns curve fitting into ordinary least squares.
+
+1. Strength profile. In concentric samples (the arm moves against the
+   resistance) the patient's torque is the measured torque. With a linear
+   force-velocity relation, capacity at position x is
+   T0(x) = |torque| / (1 - |v| / v_max). Patients rarely push to their limit
+   on every rep, so the upper quantile of T0 is taken per fine position bin.
+   That takes one sort of all samples. An N-point curve is then fitted to
+   the bins, weighted by sample count.
+2. Target. The output curve is solved against one of these targets:
+     matched          resistance proportional to T0(x)
+     constant-effort  resistance = level x the torque the patient can produce
+                      at x at the speed they actually move there, so
+                      relative effort stays constant through the ROM
+   A second-difference penalty keeps the curve smooth. Values are clipped to
+   [0, 1] and scaled so the peak is 1. The suggested max torque is written
+   alongside.
+
+The JSON output loads with `tester.py --curve-file` (the n-point "curve")
+and the frontend's "Load Curve" button (the same curve resampled onto the 12
+EQ bars as "bars"):
+
+    python curve_fit.py --patient default --target matched -o fitted.json
+    python tester.py --curve-file fitted.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from prediction import evaluate_curve_array
+from session_log import SessionRef, add_session_args, select_sessions
+
+TARGETS = ("matched", "constant-effort")
+EQ_BARS = 12       # frontend EQ slider count; "bars" in the output is the curve resampled onto them
+MIN_VEL = 0.05     # turns/s; slower samples carry no force-velocity information
+MIN_TORQUE = 0.05  # Nm
+
+
+# ── Catmull-Rom Basis ───────────────────────────────────────────────────────
+
+def catmull_rom_basis(x: np.ndarray, n: int) -> np.ndarray:
+    """len(x) x n matrix B so that B @ curve == evaluate_curve(curve, x) (before clipping)."""
+    return evaluate_curve_array(np.eye(n), np.asarray(x, dtype=float), clip=False)
+
+
+def solve(B: np.ndarray, y: np.ndarray, w: np.ndarray, smooth: float) -> np.ndarray:
+    """Weighted least squares for the control points with a second-difference penalty."""
+    D = np.diff(np.eye(B.shape[1]), 2, axis=0)
+    Bw = B * w[:, None]
+    return np.linalg.solve(Bw.T @ B + smooth * w.sum() * (D.T @ D), Bw.T @ y)
+
+
+def binned_quantile(x: np.ndarray, y: np.ndarray, q: float, bins: int):
+    """Per-bin centers, sample counts and q-quantile of y, from one sort of all samples."""
+    b = np.minimum((np.clip(x, 0.0, 1.0) * bins).astype(int), bins - 1)
+    order = np.lexsort((y, b))
+    counts = np.bincount(b, minlength=bins)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has = counts > 0
+    picks = starts[has] + np.minimum((q * counts[has]).astype(int), counts[has] - 1)
+    centers = (np.arange(bins) + 0.5) / bins
+    return centers[has], counts[has].astype(float), y[order][picks], b, has
+
+
+# ── Samples ─────────────────────────────────────────────────────────────────
+
+def load_samples(sessions: List[SessionRef]):
+    """Concentric (x, |vel|, |torque|) samples from all sessions, as arrays."""
+    xs, vs, ts, used = [], [], [], []
+    for s in sessions:
+        rows = s.read_rows()
+        if not rows or "normalized" not in rows[0] or "torque_estimate_Nm" not in rows[0]:
+            continue
+        meta = s.read_meta() or {}
+        try:
+            arr = np.array([[float(r["normalized"]), float(r["velocity_turns_s"]),
+                             float(r["torque_estimate_Nm"])] for r in rows], dtype=float)
+        except (KeyError, TypeError, ValueError):
+            continue
+        x, v, tau = arr.T
+        if int(meta.get("direction", 1)) == -1:
+            x = 1.0 - x
+        # Concentric: the patient drives the arm against the motor torque
+        keep = (tau * v < 0) & (np.abs(v) >= MIN_VEL) & (np.abs(tau) >= MIN_TORQUE)
+        if keep.any():
+            xs.append(x[keep])
+            vs.append(np.abs(v[keep]))
+            ts.append(np.abs(tau[keep]))
+            used.append(s.name)
+    if not xs:
+        return None
+    return np.concatenate(xs), np.concatenate(vs), np.concatenate(ts), used
+
+
+def fit_curve(x: np.ndarray, vel: np.ndarray, torque: np.ndarray, n: int = 12,
+              target: str = "matched", level: float = 0.6, quantile: float = 0.9,
+              smooth: float = 1e-3, v_max: Optional[float] = None, bins: Optional[int] = None) -> dict:
+    """Fit the strength profile, then the n-point curve for `target`."""
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target '{target}'. Options: {list(TARGETS)}")
+    v_max = v_max or 1.25 * float(np.percentile(vel, 99))
+    slowdown = np.clip(1.0 - vel / v_max, 0.2, 1.0)
+    bins = bins or int(np.clip(len(x) // 50, 2 * n, 240))  # ~50 samples per bin, up to 240
+
+    # Strength: upper quantile of force-velocity corrected torque per position bin.
+    # One sort of all samples; the least-squares problems below are bins x n.
+    centers, counts, t0, b, has = binned_quantile(x, torque / slowdown, quantile, bins)
+    B = catmull_rom_basis(centers, n)
+    strength = solve(B, t0, counts, smooth)  # T0 control points, Nm
+    if target == "matched":
+        resistance = level * strength
+    else:
+        # Patient torque available at the speed actually used at each position
+        mean_slowdown = (np.bincount(b, slowdown, minlength=bins) / np.maximum(np.bincount(b, minlength=bins), 1))[has]
+        resistance = solve(B, level * (B @ strength) * mean_slowdown, counts, smooth)
+
+    peak = float(np.max(resistance))
+    if peak <= 0:
+        raise ValueError("Fitted resistance is not positive anywhere; not enough concentric data")
+    curve = np.clip(resistance / peak, 0.0, 1.0)
+    rms = float(np.sqrt(np.average((B @ (curve * peak) - B @ resistance) ** 2, weights=counts)))
+    bars = evaluate_curve_array(curve, np.linspace(0.0, 1.0, EQ_BARS))
+    return {
+        "curve": [round(float(c), 4) for c in curve],
+        "bars": [round(float(b), 4) for b in bars],
+        "max_torque_Nm": round(peak, 3),
+        "strength_Nm": [round(float(s), 3) for s in strength],
+        "target": target,
+        "level": level,
+        "quantile": quantile,
+        "v_max_turns_s": round(v_max, 3),
+        "samples": int(len(x)),
+        "clip_rms_Nm": rms,
+    }
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Fit a torque curve to recorded sessions")
+    add_session_args(p)
+    p.add_argument("--patient", type=str, default=None,
+                   help="Only use sessions whose metadata names this patient")
+    p.add_argument("--target", type=str, default="matched", choices=list(TARGETS),
+                   help="Fit target (default: matched)")
+    p.add_argument("--points", type=int, default=12,
+                   help="Curve points (default: 12, the frontend EQ bar count)")
+    p.add_argument("--level", type=float, default=0.6,
+                   help="Resistance as a fraction of estimated strength (default: 0.6)")
+    p.add_argument("--quantile", type=float, default=0.9,
+                   help="Strength quantile over samples at each position (default: 0.9)")
+    p.add_argument("--smooth", type=float, default=1e-3,
+                   help="Second-difference smoothness weight (default: 1e-3)")
+    p.add_argument("--v-max", type=float, default=None,
+                   help="Unloaded max velocity in turns/s (default: 1.25 x 99th percentile)")
+    p.add_argument("-o", "--output", type=str, default="fitted_curve.json",
+                   help="Output JSON (default: fitted_curve.json)")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sessions = select_sessions(args)
+    if args.patient is not None:
+        sessions = [s for s in sessions if (s.read_meta() or {}).get("patient", "default") == args.patient]
+        if not sessions:
+            print(f"No sessions for patient '{args.patient}'.")
+            sys.exit(1)
+
+    t0 = time.perf_counter()
+    samples = load_samples(sessions)
+    if samples is None:
+        print("No concentric samples (moving against the motor torque) in the selected sessions.")
+        sys.exit(1)
+    x, vel, torque, used = samples
+    t_load = time.perf_counter() - t0
+    try:
+        result = fit_curve(x, vel, torque, args.points, args.target, args.level,
+                           args.quantile, args.smooth, args.v_max)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    result["sessions"] = used
+    t_fit = time.perf_counter() - t0 - t_load
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"{len(used)} session(s), {result['samples']} concentric samples "
+          f"(load {t_load:.2f} s, fit {t_fit:.2f} s)")
+    print("Strength (Nm): " + " ".join(f"{s:.2f}" for s in result["strength_Nm"]))
+    print(f"Curve ({args.target}, peak {result['max_torque_Nm']:.2f} Nm): "
+          + " ".join(f"{v:.0%}" for v in result["curve"]))
+    print(f"Saved → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
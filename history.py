@@ -0,0 +1,95 @@
+"""BERR EXO — Multi-resolution, min/max-preserving session history.
+
+The backend appends every control tick; any time window can then be served at
+screen resolution without shipping every raw sample to the browser. Each level
+keeps per-bucket min/max, so short torque spikes survive downsampling.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence
+
+# Channels kept for the charts
+FIELDS = ("torque", "torque_estimate", "pos_deg")
+
+# Bucket widths (s) of the downsampled levels, finest first. Raw samples are level 0.
+LEVEL_WIDTHS = (0.1, 0.4, 1.6, 6.4, 25.6)
+
+
+class _Level:
+    def __init__(self, width: float, fields: Sequence[str]):
+        self.width = width
+        self.keys: List[int] = []     # bucket index = floor(t / width)
+        self.t: List[float] = []      # bucket start time
+        self.min: Dict[str, List[float]] = {f: [] for f in fields}
+        self.max: Dict[str, List[float]] = {f: [] for f in fields}
+
+    def add(self, t: float, values: Dict[str, float]) -> None:
+        key = int(t // self.width)
+        if self.keys and self.keys[-1] == key:
+            for f, v in values.items():
+                if v < self.min[f][-1]:
+                    self.min[f][-1] = v
+                if v > self.max[f][-1]:
+                    self.max[f][-1] = v
+        else:
+            self.keys.append(key)
+            self.t.append(key * self.width)
+            for f, v in values.items():
+                self.min[f].append(v)
+                self.max[f].append(v)
+
+
+class SessionHistory:
+    """Append-only history of one session with precomputed min/max pyramids."""
+
+    def __init__(self, fields: Sequence[str] = FIELDS, widths: Sequence[float] = LEVEL_WIDTHS):
+        self.fields = tuple(fields)
+        self.t: List[float] = []
+        self.raw: Dict[str, List[float]] = {f: [] for f in self.fields}
+        self.levels = [_Level(w, self.fields) for w in widths]
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def append(self, t: float, **values: float) -> None:
+        vals = {f: float(values[f]) for f in self.fields}
+        self.t.append(t)
+        for f, v in vals.items():
+            self.raw[f].append(v)
+        for level in self.levels:
+            level.add(t, vals)
+
+    def query(self, t0: Optional[float] = None, t1: Optional[float] = None, points: int = 600) -> dict:
+        """Return the samples in [t0, t1] reduced to at most ~points values per channel.
+
+        Picks the finest level whose bucket count in the window fits the point
+        budget (each bucket costs two points: min and max). Raw samples are
+        returned with min == max.
+        """
+        if not self.t:
+            return {"t": [], "t0": t0, "t1": t1, "resolution": 0.0,
+                    **{f: {"min": [], "max": []} for f in self.fields}}
+        t_end = self.t[-1]
+        t1 = t_end if t1 is None else min(t1, t_end)
+        t0 = self.t[0] if t0 is None else max(t0, self.t[0])
+        points = max(2, int(points))
+
+        lo = bisect_left(self.t, t0)
+        hi = bisect_right(self.t, t1)
+        if hi - lo <= points:
+            return {
+                "t": self.t[lo:hi], "t0": t0, "t1": t1, "resolution": 0.0,
+                **{f: {"min": self.raw[f][lo:hi], "max": self.raw[f][lo:hi]} for f in self.fields},
+            }
+
+        level = self.levels[-1]
+        for candidate in self.levels:
+            if (t1 - t0) / candidate.width <= points / 2:
+                level = candidate
+                break
+        lo = bisect_right(level.t, t0) - 1 if level.t and level.t[0] <= t0 else 0
+        hi = bisect_right(level.t, t1)
+        return {
+            "t": level.t[lo:hi], "t0": t0, "t1": t1, "resolution": level.width,
+            **{f: {"min": level.min[f][lo:hi], "max": level.max[f][lo:hi]} for f in self.fields},
+        }
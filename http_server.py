@@ -0,0 +1,307 @@
+"""BERR EXO — Static frontend + log download API on the websocket port.
+
+Plugged into websockets.serve(process_request=...): plain HTTP GETs are
+answered here, websocket upgrades fall through to the normal handler.
+
+  /                          frontend/index.html (ETag revalidation)
+  /vendor/<file>             vendored JS (ETag + immutable caching)
+  /api/sessions              JSON list of logged sessions in both log dirs, archives included
+  /api/logs/<source>/<file>  log download, gzip or single byte-range
+  /api/logs/<source>/archive/<archive>/<file>   one session extracted from a retention archive
+
+Chart.js is served only from frontend/vendor/; there is no CDN fallback, so
+an offline install without `--vendor-assets` shows an error instead of
+silently depending on the internet.
+
+File reads and compression run in a worker thread so large downloads never
+stall the control loop sharing the event loop.
+"""
+
+import asyncio
+import email.utils
+import gzip
+import http
+import json
+import mimetypes
+import tarfile
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from websockets.datastructures import Headers
+from websockets.http11 import Response
+
+from session_log import ARCHIVE_DIR, ARCHIVE_GLOB, BACKEND_LOG_DIR, ROOT, SESSION_RE, TESTER_LOG_DIR, SessionRef
+
+FRONTEND_DIR = ROOT / "frontend"
+VENDOR_DIR = FRONTEND_DIR / "vendor"
+
+# Log sources by URL name: backend.py sessions and tester.py runs
+LOG_DIRS = {
+    "backend": BACKEND_LOG_DIR,
+    "tester": TESTER_LOG_DIR,
+}
+
+# Pinned third-party assets: source URL and the version banner near the top of the file
+# (jsDelivr prepends its own comment to the upstream one).
+# Installed once with `python backend.py --vendor-assets [DIR]`.
+VENDOR_ASSETS = {
+    "chart.umd.min.js": ("https://cdn.jsdelivr.net/npm/chart.js@4.4.3/dist/chart.umd.min.js", b"Chart.js v4.4.3"),
+}
+
+GZIP_MIN_BYTES = 1024
+_gzip_cache: Dict[str, bytes] = {}  # etag -> compressed body
+_GZIP_CACHE_MAX = 8
+
+
+def missing_vendor_assets() -> list:
+    """Names of pinned assets not present in frontend/vendor/."""
+    return [name for name in VENDOR_ASSETS if not (VENDOR_DIR / name).is_file()]
+
+
+def vendor_assets(source_dir: Optional[str] = None) -> None:
+    """Install the pinned frontend assets into frontend/vendor/, from source_dir or the CDN.
+
+    Raises ValueError if a file is not the pinned version.
+    """
+    VENDOR_DIR.mkdir(parents=True, exist_ok=True)
+    for name, (url, banner) in VENDOR_ASSETS.items():
+        if source_dir:
+            print(f"Copying {Path(source_dir) / name}...")
+            data = (Path(source_dir) / name).read_bytes()
+        else:
+            print(f"Fetching {url}...")
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                data = resp.read()
+        if banner not in data[:1024]:
+            raise ValueError(f"{name} is not {banner.decode()}")
+        (VENDOR_DIR / name).write_bytes(data)
+        print(f"  -> {VENDOR_DIR / name}")
+
+
+# ── Responses ──
+
+def _response(status: int, body: bytes, content_type: str, extra: Optional[Dict[str, str]] = None) -> Response:
+    status = http.HTTPStatus(status)
+    headers = Headers([
+        ("Date", email.utils.formatdate(usegmt=True)),
+        ("Connection", "close"),
+        ("Content-Length", str(len(body))),
+        ("Content-Type", content_type),
+    ])
+    for k, v in (extra or {}).items():
+        headers[k] = v
+    return Response(status.value, status.phrase, headers, body)
+
+
+def _text(status: int, message: str) -> Response:
+    return _response(status, message.encode(), "text/plain; charset=utf-8")
+
+
+def _etag(path: Path) -> str:
+    st = path.stat()
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _etag_matches(request_headers: Headers, *etags: str) -> bool:
+    """True if If-None-Match names any of etags (or is '*')."""
+    header = request_headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    return "*" in tags or any(e in tags for e in etags)
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=a-b' range into inclusive (start, end); None if unsatisfiable."""
+    spec = header.strip()
+    if not spec.startswith("bytes=") or "," in spec:
+        return None
+    start_s, _, end_s = spec[6:].partition("-")
+    try:
+        if not start_s:  # suffix range: last N bytes
+            n = int(end_s)
+            if n <= 0:
+                return None
+            return max(0, size - n), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _serve_file(path: Path, request_headers: Headers, cache_control: str, compress: bool) -> Response:
+    if not path.is_file():
+        return _text(404, "Not found")
+    etag = _etag(path)
+    content_type, encoding = mimetypes.guess_type(path.name)
+    content_type = content_type or "application/octet-stream"
+    if encoding is not None or path.suffix == ".zst":
+        # Already-compressed logs are downloaded as the stored file
+        content_type = "application/zstd" if path.suffix == ".zst" else f"application/{encoding}"
+        compress = False
+    elif content_type.startswith("text/") or content_type.endswith("javascript") or content_type.endswith("json"):
+        content_type += "; charset=utf-8"
+    common = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    gz_etag = etag[:-1] + '-gz"'
+
+    # A client holding either representation may revalidate with its ETag
+    if _etag_matches(request_headers, etag, gz_etag):
+        return _response(304, b"", content_type, common)
+
+    size = path.stat().st_size
+    range_header = request_headers.get("Range")
+    if range_header and request_headers.get("If-Range", etag) == etag:
+        rng = _parse_range(range_header, size)
+        if rng is None:
+            return _response(416, b"", content_type, {**common, "Content-Range": f"bytes */{size}"})
+        start, end = rng
+        with open(path, "rb") as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+        return _response(206, body, content_type, {**common, "Content-Range": f"bytes {start}-{end}/{size}"})
+
+    body = path.read_bytes()
+    accepts_gzip = "gzip" in request_headers.get("Accept-Encoding", "")
+    if compress and accepts_gzip and size >= GZIP_MIN_BYTES:
+        packed = _gzip_cache.get(etag)
+        if packed is None:
+            packed = gzip.compress(body, compresslevel=6)
+            if len(_gzip_cache) >= _GZIP_CACHE_MAX:
+                _gzip_cache.pop(next(iter(_gzip_cache)))
+            _gzip_cache[etag] = packed
+        # Ranges above refer to the identity encoding, so the gzip ETag must differ
+        return _response(200, packed, content_type, {
+            **common, "ETag": gz_etag, "Content-Encoding": "gzip", "Vary": "Accept-Encoding",
+        })
+    return _response(200, body, content_type, {**common, "Vary": "Accept-Encoding"})
+
+
+def _read_meta(data: bytes) -> Optional[dict]:
+    try:
+        return json.loads(data)
+    except ValueError:
+        return None
+
+
+def list_sessions() -> list:
+    """Every logged session (newest first) with size, mtime and its meta sidecar if present."""
+    sessions = []
+    for source, log_dir in LOG_DIRS.items():
+        if not log_dir.is_dir():
+            continue
+        for csv_path in log_dir.iterdir():
+            m = SESSION_RE.match(csv_path.name)
+            if not m:
+                continue
+            meta_path = csv_path.with_name(m.group(1) + "_meta.json")
+            meta = _read_meta(meta_path.read_bytes()) if meta_path.is_file() else None
+            st = csv_path.stat()
+            sessions.append({
+                "source": source,
+                "name": csv_path.name,
+                "compression": {".gz": "gzip", ".zst": "zstd"}.get(m.group(3)),
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "url": f"/api/logs/{source}/{csv_path.name}",
+                "meta_url": f"/api/logs/{source}/{meta_path.name}" if meta is not None else None,
+                "meta": meta,
+                "archive": None,
+            })
+        # Sessions moved into monthly archives by session_log.py retention
+        for archive in sorted((log_dir / ARCHIVE_DIR).glob(ARCHIVE_GLOB)):
+            with tarfile.open(archive, "r:xz") as tar:
+                members = {m.name: m for m in tar.getmembers()}
+                for member in members.values():
+                    m = SESSION_RE.match(member.name)
+                    if not m:
+                        continue
+                    meta_name = m.group(1) + "_meta.json"
+                    meta = _read_meta(tar.extractfile(meta_name).read()) if meta_name in members else None
+                    base = f"/api/logs/{source}/{ARCHIVE_DIR}/{archive.name}"
+                    sessions.append({
+                        "source": source,
+                        "name": member.name,
+                        "compression": None,
+                        "size": member.size,
+                        "mtime": SessionRef(m.group(1), archive).started.timestamp(),
+                        "url": f"{base}/{member.name}",
+                        "meta_url": f"{base}/{meta_name}" if meta is not None else None,
+                        "meta": meta,
+                        "archive": archive.name,
+                    })
+    sessions.sort(key=lambda s: s["mtime"], reverse=True)
+    return sessions
+
+
+def _safe_child(base: Path, name: str) -> Optional[Path]:
+    path = (base / name).resolve()
+    return path if path.parent == base.resolve() or base.resolve() in path.parents else None
+
+
+def _serve_archive_member(archive: Path, member: str, request_headers: Headers) -> Response:
+    """Download one file from a retention archive (decompressed, gzip on the wire if accepted)."""
+    etag = _etag(archive)[:-1] + "-" + member + '"'
+    content_type = "application/json" if member.endswith(".json") else "text/csv; charset=utf-8"
+    common = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding",
+              "Content-Disposition": f'attachment; filename="{member}"'}
+    if _etag_matches(request_headers, etag):
+        return _response(304, b"", content_type, common)
+    try:
+        with tarfile.open(archive, "r:xz") as tar:
+            body = tar.extractfile(member).read()
+    except (KeyError, AttributeError, tarfile.TarError):
+        return _text(404, "Not found")
+    if "gzip" in request_headers.get("Accept-Encoding", "") and len(body) >= GZIP_MIN_BYTES:
+        return _response(200, gzip.compress(body, compresslevel=6), content_type,
+                         {**common, "Content-Encoding": "gzip"})
+    return _response(200, body, content_type, common)
+
+
+def _route(path: str, request_headers: Headers) -> Response:
+    if path in ("/", "/index.html"):
+        return _serve_file(FRONTEND_DIR / "index.html", request_headers, "no-cache", compress=True)
+
+    if path.startswith("/vendor/"):
+        target = _safe_child(VENDOR_DIR, path[len("/vendor/"):])
+        if target is None:
+            return _text(404, "Not found")
+        return _serve_file(target, request_headers, "public, max-age=31536000, immutable", compress=True)
+
+    if path == "/api/sessions":
+        body = json.dumps(list_sessions()).encode()
+        return _response(200, body, "application/json", {"Cache-Control": "no-store"})
+
+    if path.startswith("/api/logs/"):
+        source, _, name = path[len("/api/logs/"):].partition("/")
+        log_dir = LOG_DIRS.get(source)
+        if log_dir and name.startswith(ARCHIVE_DIR + "/"):
+            archive_name, _, member = name[len(ARCHIVE_DIR) + 1:].partition("/")
+            archive = _safe_child(log_dir / ARCHIVE_DIR, archive_name) if archive_name and member else None
+            if archive is None or not archive.is_file() or "/" in member:
+                return _text(404, "Not found")
+            return _serve_archive_member(archive, member, request_headers)
+        target = _safe_child(log_dir, name) if log_dir and name and "/" not in name else None
+        if target is None:
+            return _text(404, "Not found")
+        response = _serve_file(target, request_headers, "no-cache", compress=True)
+        response.headers["Content-Disposition"] = f'attachment; filename="{target.name}"'
+        return response
+
+    return _text(404, "Not found")
+
+
+async def process_request(connection, request) -> Optional[Response]:
+    """websockets process_request hook: serve plain HTTP, pass upgrades through."""
+    if request.headers.get("Upgrade", "").lower() == "websocket":
+        return None
+    path = unquote(urlsplit(request.path).path)
+    try:
+        return await asyncio.to_thread(_route, path, request.headers)
+    except OSError as e:
+        print(f"HTTP error serving {path}: {e}")
+        return _text(500, "Internal error")
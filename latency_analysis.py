@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""BERR EXO — Command-to-response latency and bandwidth from logged sessions.
+
+For each session the commanded torque and the ODrive torque estimate are
+resampled onto a uniform grid and compared two ways:
+
+  * cross-correlation (FFT, with parabolic sub-sample refinement) gives the
+    end-to-end delay of host loop + USB + current loop;
+  * a first-order-plus-dead-time fit (gain K, lag tau, delay d) gives the
+    10-90 % rise time (2.2 tau) and the -3 dB bandwidth 1 / (2 pi tau).
+
+Results are printed per session and summarized per dt / transport setting,
+so loop-rate changes can be judged by measured improvement. Command and
+estimate are sampled in the same tick, so delays shorter than the
+resampling step are reported as "<step". Lags shorter than the step cannot
+be told apart either, so the tau grid starts at the step: a fit landing there
+reports the bandwidth as a lower bound (">1/(2 pi step)") and the rise time
+as an upper bound. The markers carry through to the summary medians and the JSON.
+
+    python latency_analysis.py                      # every session in both log dirs
+    python latency_analysis.py logs/berr_exo_log_20260225_124133.csv --json out.json
+"""
+
+import argparse
+import json
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from session_log import SessionRef, add_session_args, select_sessions
+
+MAX_LAG_S = 0.5
+MIN_EXCITATION_NM = 0.02  # std of commanded torque below this carries no timing information
+TAU_MAX_S = 0.3
+TAU_GRID_POINTS = 48
+
+
+def _num(value: Optional[str]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def load_pair(session: SessionRef):
+    """(t, commanded, estimate) arrays from a session, sorted by time."""
+    keys = ("time_s", "commanded_torque_Nm", "torque_estimate_Nm")
+    arr = np.array([[_num(r.get(k)) for k in keys] for r in session.read_rows()], dtype=float).reshape(-1, 3)
+    arr = arr[~np.isnan(arr).any(axis=1)]
+    arr = arr[np.argsort(arr[:, 0], kind="stable")]
+    return arr[:, 0], arr[:, 1], arr[:, 2]
+
+
+def resample(t: np.ndarray, *series: np.ndarray, step: float):
+    grid = np.arange(t[0], t[-1], step)
+    return (grid, *(np.interp(grid, t, s) for s in series))
+
+
+def xcorr_delay(cmd: np.ndarray, est: np.ndarray, step: float, max_lag_s: float = MAX_LAG_S):
+    """Lag (s) at which est best matches cmd, and the normalized peak correlation."""
+    a = cmd - cmd.mean()
+    b = est - est.mean()
+    n = len(a)
+    nfft = 1 << int(math.ceil(math.log2(2 * n)))
+    corr = np.fft.irfft(np.conj(np.fft.rfft(a, nfft)) * np.fft.rfft(b, nfft), nfft)[:n]
+    max_lag = min(n - 2, int(max_lag_s / step))
+    corr = corr[:max_lag + 1]
+    k = int(np.argmax(corr))
+    # Parabolic interpolation around the peak for sub-sample resolution
+    frac = 0.0
+    if 0 < k < max_lag:
+        y0, y1, y2 = corr[k - 1], corr[k], corr[k + 1]
+        denom = y0 - 2 * y1 + y2
+        frac = 0.5 * (y0 - y2) / denom if denom != 0 else 0.0
+    norm = np.sqrt((a * a).sum() * (b * b).sum())
+    return (k + frac) * step, float(corr[k] / norm) if norm > 0 else 0.0
+
+
+def lag_responses(u: np.ndarray, step: float, taus: np.ndarray):
+    """Unit-gain first-order lag of u for each tau, starting at rest at u[0]; yields (j, y).
+
+    The recursion y[i] = y[i-1] + alpha (u[i] - y[i-1]) is evaluated in closed
+    form through its transfer function alpha / (1 - (1 - alpha) z^-1), one FFT
+    product per tau, instead of stepping through the samples in Python.
+    """
+    n = len(u)
+    nfft = 1 << int(math.ceil(math.log2(2 * n)))  # zero padding keeps the convolution linear
+    spectrum = np.fft.rfft(u - u[0], nfft)
+    z_inv = np.exp(-2j * np.pi * np.arange(nfft // 2 + 1) / nfft)
+    for j, tau in enumerate(taus):
+        alpha = 1.0 - math.exp(-step / tau)
+        yield j, u[0] + np.fft.irfft(spectrum * (alpha / (1.0 - (1.0 - alpha) * z_inv)), nfft)[:n]
+
+
+def fit_fopdt(cmd: np.ndarray, est: np.ndarray, step: float, delay_guess: float) -> Dict[str, float]:
+    """Least-squares first-order-plus-dead-time fit over a (delay, tau) grid.
+
+    The lag is linear and time-invariant and starts at rest, so the response
+    to the delayed command is the undelayed response shifted: each tau is
+    simulated once and every candidate delay is a slice of it.
+    """
+    # Shorter lags than the step all fit alike, so the grid starts there
+    taus = np.geomspace(step, max(TAU_MAX_S, 2 * step), TAU_GRID_POINTS)
+    best = None
+    d0 = int(round(delay_guess / step))
+    delays = range(max(0, d0 - 3), d0 + 4)
+    n = len(cmd)
+    for j, y0 in lag_responses(cmd, step, taus):
+        for d in delays:
+            y = np.concatenate((np.full(d, cmd[0]), y0[:n - d])) if d else y0
+            # Closed-form optimal gain, then residual
+            gain = float(y @ est) / max(float(y @ y), 1e-12)
+            sse = float(((est - gain * y) ** 2).sum())
+            if best is None or sse < best[0]:
+                best = (sse, d, j, gain)
+    sse, d, j, gain = best
+    tau = float(taus[j])
+    var = float(((est - est.mean()) ** 2).sum())
+    return {
+        "fit_delay_ms": d * step * 1000,
+        "fit_delay_is_upper_bound": d == 0,
+        "tau_ms": tau * 1000,
+        "rise_time_ms": 2.197 * tau * 1000,
+        "bandwidth_Hz": 1.0 / (2 * math.pi * tau),
+        "bandwidth_is_lower_bound": j == 0,  # tau not above the step: rise time is an upper bound
+        "gain": gain,
+        "fit_r2": 1.0 - sse / var if var > 0 else 0.0,
+    }
+
+
+def analyze_session(session: SessionRef) -> Optional[dict]:
+    t, cmd, est = load_pair(session)
+    if len(t) < 20:
+        return None
+    meta = session.read_meta() or {}
+    period = float(np.median(np.diff(t)))
+    if period <= 0 or float(np.std(cmd)) < MIN_EXCITATION_NM:
+        return None
+    step = period / 2  # oversample so the delay isn't quantized to whole ticks
+    _, cmd_u, est_u = resample(t, cmd, est, step=step)
+    delay, peak = xcorr_delay(cmd_u, est_u, step)
+    result = {
+        "session": session.name,
+        "dt_s": meta.get("dt_s"),
+        # Sessions logged before the key existed all ran over USB
+        "transport": meta.get("transport") or "usb",
+        "tick_ms": period * 1000,
+        "samples": len(t),
+        "xcorr_delay_ms": delay * 1000,
+        "xcorr_delay_is_upper_bound": delay < step,
+        "xcorr_peak": peak,
+        "resolution_ms": step * 1000,
+    }
+    result.update(fit_fopdt(cmd_u, est_u, step, delay))
+    return result
+
+
+def _bounded_median(rs: List[dict], key: str, flag: str, bound_key: Optional[str] = None):
+    """Median of r[key], and whether it is only a bound.
+
+    Sessions flagged as bounds contribute their bound (resolution_ms for
+    bound_key). Every value then errs in the same direction, so the median
+    does too: it is exact only if no session was a bound.
+    """
+    values = [r[bound_key] if bound_key and r[flag] else r[key] for r in rs]
+    return float(np.median(values)), any(r[flag] for r in rs)
+
+
+def summarize(results: List[dict]) -> List[dict]:
+    groups: Dict[tuple, List[dict]] = {}
+    for r in results:
+        groups.setdefault((r["dt_s"], r["transport"]), []).append(r)
+    out = []
+    for (dt, transport), rs in sorted(groups.items(), key=lambda kv: (kv[0][0] or 0, kv[0][1])):
+        delay, delay_bound = _bounded_median(rs, "xcorr_delay_ms", "xcorr_delay_is_upper_bound", "resolution_ms")
+        rise, rise_bound = _bounded_median(rs, "rise_time_ms", "bandwidth_is_lower_bound")
+        bw, bw_bound = _bounded_median(rs, "bandwidth_Hz", "bandwidth_is_lower_bound")
+        out.append({
+            "dt_s": dt, "transport": transport, "sessions": len(rs),
+            "tick_ms": float(np.median([r["tick_ms"] for r in rs])),
+            "xcorr_delay_ms": delay, "xcorr_delay_is_upper_bound": delay_bound,
+            "rise_time_ms": rise, "rise_time_is_upper_bound": rise_bound,
+            "bandwidth_Hz": bw, "bandwidth_is_lower_bound": bw_bound,
+        })
+    return out
+
+
+def format_bound(value: float, is_bound: bool, marker: str, fmt: str = ".1f", plain: str = "") -> str:
+    """value with a '<' / '>' marker when it is only a bound (`plain` otherwise)."""
+    return (marker if is_bound else plain) + format(value, fmt)
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Command-to-response latency estimator")
+    add_session_args(p)
+    p.add_argument("--json", type=str, default=None,
+                   help="Also write per-session and summary results to this JSON file")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sessions = select_sessions(args)
+
+    results = []
+    print(f"{'session':<30} {'dt':>5} {'tick':>6} {'delay':>7} {'fit d':>6} {'rise':>6} "
+          f"{'BW':>6} {'r²':>5}")
+    print(f"{'':<30} {'ms':>5} {'ms':>6} {'ms':>7} {'ms':>6} {'ms':>6} {'Hz':>6}")
+    for s in sessions:
+        r = analyze_session(s)
+        if r is None:
+            print(f"{s.name:<30} skipped (too short or no torque excitation)")
+            continue
+        results.append(r)
+        dt_ms = f"{r['dt_s'] * 1000:.0f}" if r["dt_s"] else "?"
+        delay = (format_bound(r["resolution_ms"], True, "<") if r["xcorr_delay_is_upper_bound"]
+                 else format_bound(r["xcorr_delay_ms"], False, "<"))
+        fit_d = (format_bound(r["resolution_ms"], True, "<") if r["fit_delay_is_upper_bound"]
+                 else format_bound(r["fit_delay_ms"], False, "<"))
+        rise = format_bound(r["rise_time_ms"], r["bandwidth_is_lower_bound"], "<")
+        bw = format_bound(r["bandwidth_Hz"], r["bandwidth_is_lower_bound"], ">", ".0f")
+        print(f"{s.name:<30} {dt_ms:>5} {r['tick_ms']:>6.1f} {delay:>7} "
+              f"{fit_d:>6} {rise:>6} {bw:>6} {r['fit_r2']:>5.2f}")
+
+    summary = summarize(results)
+    if summary:
+        print("\n=== Per dt / transport (medians) ===")
+        for g in summary:
+            dt_ms = f"{g['dt_s'] * 1000:.0f} ms" if g["dt_s"] else "?"
+            print(f"dt={dt_ms:<6} {g['transport']:<5} n={g['sessions']:<3} tick={g['tick_ms']:.1f} ms  "
+                  f"delay{format_bound(g['xcorr_delay_ms'], g['xcorr_delay_is_upper_bound'], '<', plain='=')} ms  "
+                  f"rise{format_bound(g['rise_time_ms'], g['rise_time_is_upper_bound'], '<', plain='=')} ms  "
+                  f"BW{format_bound(g['bandwidth_Hz'], g['bandwidth_is_lower_bound'], '>', plain='=')} Hz")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"sessions": results, "summary": summary}, f, indent=2)
+        print(f"\nResults → {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""BERR EXO — Websocket load generator and fan-out stress test.
+
+Starts `backend.py --simulate` on a spare port (or targets a running backend
+with --url). It then runs one stage per client count. In each stage:
+
+  * N dashboard clients connect. A seeded fraction read slowly (--slow-*),
+    and another fraction stop reading mid-stage (--stall-*).
+  * Every --storm-interval seconds a fraction of clients drop and reconnect
+    at once (reconnect storm).
+  * A controller client sends start, waits --duration seconds, then stop.
+
+Per stage it records:
+  * delivered message rate per client
+  * end-to-end telemetry latency (backend send timestamp to client receive)
+  * reconnects
+  * the backend's tick jitter and deadline misses, read from the
+    shared-memory telemetry tap (every tick; falls back to the
+    controller's telemetry). A spawned backend publishes under its own tap
+    name, so a live backend's tap is never touched.
+  * frames the backend dropped for slow clients (from its log)
+
+The same seed gives the same client mix, stall times and storm selections, so
+runs are comparable for capacity planning.
+
+    python loadgen.py --clients 1,10,50,200 --duration 10 --json capacity.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import websockets
+
+from telemetry_tap import DEFAULT_NAME as DEFAULT_TAP_NAME, TelemetryReader
+
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+# ── Simulated Dashboard Client ──────────────────────────────────────────────
+
+class LoadClient:
+    """One dashboard connection with a configurable read behaviour."""
+
+    def __init__(self, cid: int, url: str, read_delay: float = 0.0,
+                 stall_at: Optional[float] = None, stall_for: float = 0.0):
+        self.cid = cid
+        self.url = url
+        self.read_delay = read_delay  # seconds spent "rendering" each message
+        self.stall_at = stall_at      # stage-relative time to stop reading
+        self.stall_for = stall_for
+        self.kind = "stall" if stall_at is not None else "slow" if read_delay > 0 else "fast"
+        self.ws = None
+        self.received = 0
+        self.telemetry = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.stopped = asyncio.Event()
+        self._done = False
+
+    async def run(self, t0: float) -> None:
+        stalled = False
+        while not self._done:
+            try:
+                async with websockets.connect(self.url, max_size=None, open_timeout=10) as ws:
+                    self.ws = ws
+                    async for message in ws:
+                        self.received += 1
+                        self.bytes += len(message)
+                        data = json.loads(message)
+                        if data.get("type") == "telemetry":
+                            self.telemetry += 1
+                            if "ts" in data:
+                                self.latencies.append(time.time() - data["ts"])
+                        elif data.get("type") == "status" and data.get("message") == "stopped":
+                            self.stopped.set()
+                        if self.read_delay:
+                            await asyncio.sleep(self.read_delay)
+                        if not stalled and self.stall_at is not None and time.perf_counter() - t0 >= self.stall_at:
+                            stalled = True
+                            await asyncio.sleep(self.stall_for)
+            except websockets.ConnectionClosed:
+                pass
+            except (OSError, asyncio.TimeoutError):
+                if self._done:
+                    break
+                self.connect_failures += 1
+                await asyncio.sleep(0.1)
+                continue
+            if not self._done:
+                self.reconnects += 1
+
+    async def drop(self) -> None:
+        """Close the socket; run() reconnects immediately (reconnect storm)."""
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def close(self) -> None:
+        self._done = True
+        if self.ws is not None:
+            await self.ws.close()
+
+
+# ── Stage ───────────────────────────────────────────────────────────────────
+
+async def run_stage(url: str, n: int, args: argparse.Namespace, rng: random.Random) -> dict:
+    t0 = time.perf_counter()
+    clients = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < args.stall_fraction:
+            clients.append(LoadClient(i, url, stall_at=rng.uniform(0.2, 0.6) * args.duration,
+                                      stall_for=args.stall_seconds))
+        elif roll < args.stall_fraction + args.slow_fraction:
+            clients.append(LoadClient(i, url, read_delay=1.0 / args.slow_rate))
+        else:
+            clients.append(LoadClient(i, url))
+    controller = LoadClient(-1, url)
+    tasks = [asyncio.create_task(c.run(t0)) for c in clients + [controller]]
+    while any(c.ws is None for c in clients + [controller]):
+        await asyncio.sleep(0.05)
+
+    tap = None
+    try:
+        tap = TelemetryReader(args.tap_name)
+    except (FileNotFoundError, ValueError):
+        pass
+
+    async def storms():
+        while True:
+            await asyncio.sleep(args.storm_interval)
+            victims = rng.sample(clients, int(len(clients) * args.storm_fraction))
+            await asyncio.gather(*(c.drop() for c in victims))
+
+    storm_task = asyncio.create_task(storms()) if args.storm_interval > 0 and clients else None
+    t_start = time.perf_counter()
+    await controller.ws.send(json.dumps({"command": "start", "config": json.loads(args.config)}))
+    await asyncio.sleep(args.duration)
+    await controller.ws.send(json.dumps({"command": "stop"}))
+    if storm_task is not None:
+        storm_task.cancel()
+    try:
+        await asyncio.wait_for(controller.stopped.wait(), timeout=15)
+    except asyncio.TimeoutError:
+        print("  warning: no 'stopped' status from the backend")
+    elapsed = time.perf_counter() - t_start
+    # Count only what arrived during the session; slow clients keep draining their backlog after it
+    delivered = {c.cid: (c.telemetry, list(c.latencies)) for c in clients + [controller]}
+    await asyncio.gather(*(c.close() for c in clients + [controller]))
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Backend tick timing: every tick from the tap, else what the controller saw
+    ticks, misses, source = [], None, "telemetry"
+    if tap is not None:
+        records = tap.read_new()
+        if len(records):
+            records = records[records["session"] == records["session"][-1]]
+            ticks = [float(v) for v in records["tick_ms"][1:]]
+            misses = int(records["deadline_misses"][-1])
+            source = "tap"
+        tap.close()
+
+    result = {
+        "clients": n,
+        "duration_s": elapsed,
+        "tick_source": source,
+        "tick_count": len(ticks),
+        "tick_mean_ms": statistics.fmean(ticks) if ticks else None,
+        "tick_std_ms": statistics.pstdev(ticks) if ticks else None,
+        "tick_p99_ms": _pct(ticks, 0.99),
+        "tick_max_ms": max(ticks) if ticks else None,
+        "deadline_misses": misses,
+        "controller_rate_hz": delivered[controller.cid][0] / elapsed,
+        "groups": {},
+    }
+    for kind in ("fast", "slow", "stall"):
+        group = [c for c in clients if c.kind == kind]
+        if not group:
+            continue
+        lat = [x * 1000 for c in group for x in delivered[c.cid][1]]
+        rates = [delivered[c.cid][0] / elapsed for c in group]
+        result["groups"][kind] = {
+            "clients": len(group),
+            "rate_median_hz": statistics.median(rates),
+            "rate_min_hz": min(rates),
+            "latency_p50_ms": _pct(lat, 0.5),
+            "latency_p99_ms": _pct(lat, 0.99),
+            "latency_max_ms": max(lat) if lat else None,
+            "reconnects": sum(c.reconnects for c in group),
+            "connect_failures": sum(c.connect_failures for c in group),
+            "mbytes": sum(c.bytes for c in group) / 1e6,
+        }
+    return result
+
+
+# ── Backend Process ─────────────────────────────────────────────────────────
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def spawn_backend(port: int, seed: int, log_path: Path, tap_name: str, scratch: str) -> subprocess.Popen:
+    """Start a simulated backend on a scratch data dir so stress sessions stay out of the real logs."""
+    with open(log_path, "w") as log:  # the child keeps its own handle
+        proc = subprocess.Popen(
+            [sys.executable, "-u", str(Path(__file__).resolve().with_name("backend.py")),
+             "--simulate", "--seed", str(seed), "--port", str(port), "--tap-name", tap_name],
+            stdout=log, stderr=subprocess.STDOUT, cwd=scratch,
+            env={**os.environ, "BERR_EXO_DATA_DIR": scratch},
+        )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            socket.create_connection(("localhost", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    print(f"ERROR: simulated backend did not start. Log ({log_path}):")
+    print(log_path.read_text()[-2000:])
+    sys.exit(1)
+
+
+def stop_backend(proc: subprocess.Popen) -> None:
+    """SIGTERM, which backend.py handles like Ctrl+C so it unlinks its tap; kill if it hangs."""
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def dropped_frames(log_path: Path) -> List[int]:
+    """'Telemetry fan-out: X sent, Y dropped' lines from the backend log, in session order."""
+    return [int(m.group(1)) for m in re.finditer(r"Telemetry fan-out: \d+ sent, (\d+) dropped",
+                                                 log_path.read_text())]
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Websocket load generator / fan-out stress test")
+    p.add_argument("--url", type=str, default=None,
+                   help="Target a running backend (e.g. ws://localhost:8765) instead of spawning a simulated one")
+    p.add_argument("--tap-name", type=str, default=DEFAULT_TAP_NAME,
+                   help=f"Telemetry tap of the --url backend (default: {DEFAULT_TAP_NAME}; "
+                        "a spawned backend gets its own)")
+    p.add_argument("--clients", type=str, default="1,10,50",
+                   help="Comma-separated client counts, one stage each (default: 1,10,50)")
+    p.add_argument("--duration", type=float, default=10.0,
+                   help="Session length per stage in seconds (default: 10)")
+    p.add_argument("--slow-fraction", type=float, default=0.1,
+                   help="Fraction of clients that read slowly (default: 0.1)")
+    p.add_argument("--slow-rate", type=float, default=10.0,
+                   help="Messages/s a slow client can process (default: 10)")
+    p.add_argument("--stall-fraction", type=float, default=0.05,
+                   help="Fraction of clients that stop reading mid-stage (default: 0.05)")
+    p.add_argument("--stall-seconds", type=float, default=3.0,
+                   help="How long a stalled client stops reading (default: 3)")
+    p.add_argument("--storm-interval", type=float, default=4.0,
+                   help="Seconds between reconnect storms, 0 = none (default: 4)")
+    p.add_argument("--storm-fraction", type=float, default=0.3,
+                   help="Fraction of clients dropped per storm (default: 0.3)")
+    p.add_argument("--config", type=str, default="{}",
+                   help='Session config JSON sent with "start" (default: {})')
+    p.add_argument("--seed", type=int, default=0,
+                   help="Seed for client mix, stalls, storms and the simulated device (default: 0)")
+    p.add_argument("--json", type=str, default=None,
+                   help="Write all parameters and per-stage results to this JSON file")
+    return p.parse_args()
+
+
+def print_stage(r: dict) -> None:
+    fmt = lambda v, spec=".1f": "-" if v is None else format(v, spec)
+    print(f"  backend tick ({r['tick_source']}, {r['tick_count']}): mean {fmt(r['tick_mean_ms'])} ms  "
+          f"std {fmt(r['tick_std_ms'], '.2f')}  p99 {fmt(r['tick_p99_ms'])}  max {fmt(r['tick_max_ms'])}  "
+          f"misses {fmt(r['deadline_misses'], 'd')}  dropped frames {fmt(r.get('dropped_frames'), 'd')}")
+    print(f"  controller: {r['controller_rate_hz']:.1f} msg/s")
+    for kind, g in r["groups"].items():
+        print(f"  {kind:<5} x{g['clients']:<4} rate med {g['rate_median_hz']:6.1f}/s min {g['rate_min_hz']:6.1f}/s  "
+              f"latency p50 {fmt(g['latency_p50_ms'])} p99 {fmt(g['latency_p99_ms'])} "
+              f"max {fmt(g['latency_max_ms'])} ms  reconnects {g['reconnects']}  "
+              f"failures {g['connect_failures']}  {g['mbytes']:.1f} MB")
+
+
+def main() -> None:
+    args = parse_args()
+    try:
+        counts = [int(c) for c in args.clients.split(",")]
+        json.loads(args.config)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
+    proc, log_path, scratch = None, None, None
+    url = args.url
+    results = []
+    try:
+        if url is None:
+            port = free_port()
+            log_path = Path(tempfile.gettempdir()) / f"berr_loadgen_backend_{port}.log"
+            args.tap_name = f"berr_exo_loadgen_{port}"
+            scratch = tempfile.mkdtemp(prefix="berr_loadgen_")
+            proc = spawn_backend(port, args.seed, log_path, args.tap_name, scratch)
+            url = f"ws://localhost:{port}"
+            print(f"Simulated backend on {url} (log: {log_path})")
+
+        for n in counts:
+            print(f"\n=== {n} client(s), {args.duration:g} s ===")
+            rng = random.Random(f"{args.seed}:{n}")
+            r = asyncio.run(run_stage(url, n, args, rng))
+            if log_path is not None:
+                drops = dropped_frames(log_path)
+                r["dropped_frames"] = drops[-1] if len(drops) == len(results) + 1 else None
+            results.append(r)
+            print_stage(r)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if proc is not None:
+            stop_backend(proc)
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"params": vars(args), "stages": results}, f, indent=2)
+        print(f"\nResults → {args.json}")
+
+
+if __name__ == "__main__":
+    main()
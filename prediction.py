@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""BERR EXO — Latency-compensated curve lookup.
+
+The position used for the curve lookup is already stale when the torque is
+applied: it was sampled partway through the USB read, the torque write comes
+later, and the command then holds for roughly half a tick on average.
+PositionPredictor extrapolates pos_rel with the measured velocity to the
+expected application time, bounded by a maximum horizon.
+
+tracking_report() measures the effect offline: for each logged tick it
+compares the curve value actually commanded against the curve value at the
+position the arm really had when the torque was applied (interpolated from
+the logged positions), with and without compensation.
+
+    python prediction.py frontend/logs/berr_exo_log_20260225_131340.csv
+"""
+
+import argparse
+from typing import Optional
+
+import numpy as np
+
+from session_log import SessionRef, add_session_args, select_sessions
+
+
+class PositionPredictor:
+    """Extrapolates position to the expected torque-application time."""
+
+    def __init__(self, max_horizon: float = 0.05, transport_delay: float = 0.0, smoothing: float = 0.1):
+        self.max_horizon = max_horizon
+        self.transport_delay = transport_delay  # e.g. measured by latency_analysis.py
+        self.smoothing = smoothing
+        self.period = None
+
+    def update_period(self, period: float) -> None:
+        """Feed the measured tick period (EMA-smoothed)."""
+        if period <= 0:
+            return
+        if self.period is None:
+            self.period = period
+        else:
+            self.period += self.smoothing * (period - self.period)
+
+    def horizon(self, t_sample: float, t_apply: float) -> float:
+        h = (t_apply - t_sample) + self.transport_delay + 0.5 * (self.period or 0.0)
+        return max(0.0, min(self.max_horizon, h))
+
+    def predict(self, pos: float, vel: float, t_sample: float, t_apply: float):
+        """Return (predicted_pos, horizon_s)."""
+        h = self.horizon(t_sample, t_apply)
+        return pos + vel * h, h
+
+
+# ── Offline Tracking Error ──────────────────────────────────────────────────
+
+def evaluate_curve_array(curve, normalized: np.ndarray, clip: bool = True) -> np.ndarray:
+    """Vectorized evaluate_curve (Catmull-Rom, clamped) for an array of positions.
+
+    `curve` may also be an n x k array of k curves, giving a len(x) x k
+    result; with clip=False the result is linear in the control points
+    (curve_fit.py builds its least-squares basis from the identity).
+    """
+    c = np.asarray(curve, dtype=float)
+    n = len(c)
+    x = np.clip(normalized, 0.0, 1.0)
+    fi = x * (n - 1)
+    i = np.minimum(fi.astype(int), n - 1)
+    t = (fi - i).reshape(np.shape(fi) + (1,) * (c.ndim - 1))
+    p0 = c[np.maximum(0, i - 1)]
+    p1 = c[i]
+    p2 = c[np.minimum(n - 1, i + 1)]
+    p3 = c[np.minimum(n - 1, i + 2)]
+    t2 = t * t
+    t3 = t2 * t
+    v = 0.5 * ((2 * p1) + (-p0 + p2) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2
+               + (-p0 + 3 * p1 - 3 * p2 + p3) * t3)
+    return np.clip(v, 0.0, 1.0) if clip else v
+
+
+def _col(rows, key: str) -> Optional[np.ndarray]:
+    if not rows or key not in rows[0]:
+        return None
+    return np.array([float(r[key]) if r[key] not in ("", None) else np.nan for r in rows])
+
+
+def tracking_report(session: SessionRef, max_horizon: float = 0.05) -> Optional[dict]:
+    """RMS/max curve-tracking error (Nm) with and without position prediction."""
+    rows = session.read_rows()
+    meta = session.read_meta() or {}
+    if len(rows) < 10 or "curve" not in meta:
+        return None
+    t = _col(rows, "time_s")
+    pos = _col(rows, "pos_turns")
+    vel = _col(rows, "velocity_turns_s")
+    horizon = _col(rows, "horizon_ms")
+    pos_start = float(meta.get("pos_start_turns", pos[0]))
+    pos_range = float(meta.get("pos_range_deg", 120.0)) / 360.0
+    max_torque = abs(float(meta.get("max_torque_Nm", 1.0)))
+    direction = int(meta.get("direction", 1))
+
+    period = np.median(np.diff(t))
+    if horizon is None or not np.any(horizon > 0):
+        # Sessions logged without the predictor: assume the torque holds for half a tick
+        horizon = np.full(len(t), 0.5 * period)
+    else:
+        horizon = horizon / 1000.0
+    horizon = np.clip(horizon, 0.0, max_horizon)
+
+    def lookup(p):
+        norm = np.clip((p - pos_start) / pos_range, 0.0, 1.0)
+        return evaluate_curve_array(meta["curve"], norm if direction == 1 else 1.0 - norm)
+
+    # Position the arm actually had when each torque was applied (future samples, known offline)
+    t_apply = t + horizon
+    valid = t_apply <= t[-1]
+    truth = lookup(np.interp(t_apply[valid], t, pos))
+    raw = lookup(pos[valid])
+    pred = lookup(pos[valid] + vel[valid] * horizon[valid])
+
+    err_raw = (raw - truth) * max_torque
+    err_pred = (pred - truth) * max_torque
+    return {
+        "session": session.name,
+        "ticks": int(valid.sum()),
+        "horizon_ms": float(np.mean(horizon) * 1000),
+        "rms_raw_Nm": float(np.sqrt(np.mean(err_raw ** 2))),
+        "rms_pred_Nm": float(np.sqrt(np.mean(err_pred ** 2))),
+        "max_raw_Nm": float(np.max(np.abs(err_raw))),
+        "max_pred_Nm": float(np.max(np.abs(err_pred))),
+    }
+
+
+def format_report(r: dict) -> str:
+    # Flat curves (or no motion through curve features) have nothing to compensate
+    gain = f"{r['rms_pred_Nm'] / r['rms_raw_Nm'] - 1:+.0%}" if r["rms_raw_Nm"] > 1e-4 else "n/a"
+    return (f"Curve tracking error (horizon {r['horizon_ms']:.1f} ms): "
+            f"uncompensated rms={r['rms_raw_Nm']:.4f} Nm max={r['max_raw_Nm']:.3f} Nm | "
+            f"predicted rms={r['rms_pred_Nm']:.4f} Nm max={r['max_pred_Nm']:.3f} Nm "
+            f"({gain})")
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Curve-tracking error with/without position prediction")
+    add_session_args(p)
+    p.add_argument("--max-horizon", type=float, default=0.05,
+                   help="Prediction horizon bound in seconds (default: 0.05)")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sessions = select_sessions(args)
+    for s in sessions:
+        r = tracking_report(s, args.max_horizon)
+        if r is None:
+            print(f"{s.name}: skipped (no curve metadata or too short)")
+        else:
+            print(f"{s.name}: {format_report(r)}")
+
+
+if __name__ == "__main__":
+    main()
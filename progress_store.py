@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""BERR EXO — Cross-session progress store.
+
+Each finished session is ingested exactly once into a small SQLite database:
+per-session and per-rep aggregates (peak/mean torque, work, ROM, peak motor
+temperature) plus daily and weekly rollups per patient. Trend queries read
+only the rollup table, so they stay fast no matter how many sessions exist.
+
+    python progress_store.py --ingest             # ingest every new session in both log dirs
+    python progress_store.py --trend week         # print the weekly trend for a patient (read-only)
+"""
+
+import argparse
+import math
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from session_log import DATA_ROOT, DEFAULT_LOG_DIRS, SessionRef, iter_sessions
+
+DEFAULT_DB = DATA_ROOT / "progress.sqlite"
+DEFAULT_PATIENT = "default"
+
+# Rep detection hysteresis as fractions of the session's position range
+REP_ENTER = 0.5
+REP_EXIT = 0.15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    patient TEXT NOT NULL,
+    started TEXT NOT NULL,
+    duration_s REAL, samples INTEGER, reps INTEGER,
+    peak_torque_Nm REAL, mean_torque_Nm REAL, work_J REAL,
+    rom_deg REAL, temp_peak_C REAL
+);
+CREATE TABLE IF NOT EXISTS reps (
+    session TEXT NOT NULL, idx INTEGER NOT NULL,
+    t_start REAL, t_end REAL,
+    peak_torque_Nm REAL, mean_torque_Nm REAL, work_J REAL, rom_deg REAL,
+    PRIMARY KEY (session, idx)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    patient TEXT NOT NULL, period TEXT NOT NULL, bucket TEXT NOT NULL,
+    sessions INTEGER, reps INTEGER, duration_s REAL,
+    peak_torque_Nm REAL, torque_sum REAL, torque_samples INTEGER,
+    work_J REAL, rom_deg REAL, temp_peak_C REAL,
+    PRIMARY KEY (patient, period, bucket)
+);
+"""
+
+PERIODS = ("day", "week")
+
+
+def _f(row: Dict[str, str], key: str) -> float:
+    try:
+        return float(row[key])
+    except (KeyError, ValueError):
+        return math.nan
+
+
+# ── Aggregation ─────────────────────────────────────────────────────────────
+
+def _aggregate(t: List[float], pos: List[float], torque: List[float]) -> dict:
+    """Peak/mean |torque|, absolute mechanical work and ROM over a span of samples."""
+    work = 0.0
+    for i in range(1, len(t)):
+        work += abs(torque[i] * (pos[i] - pos[i - 1]) * math.pi / 180.0)
+    mags = [abs(x) for x in torque]
+    return {
+        "peak_torque_Nm": max(mags) if mags else 0.0,
+        "mean_torque_Nm": sum(mags) / len(mags) if mags else 0.0,
+        "torque_sum": sum(mags),
+        "work_J": work,
+        "rom_deg": (max(pos) - min(pos)) if pos else 0.0,
+    }
+
+
+def summarize_session(rows: List[Dict[str, str]]) -> dict:
+    """Session totals plus a list of per-rep aggregates."""
+    rows = [r for r in rows if not math.isnan(_f(r, "time_s"))]
+    t = [_f(r, "time_s") for r in rows]
+    pos = [_f(r, "pos_deg") for r in rows]
+    torque = [_f(r, "torque_estimate_Nm") for r in rows]
+    temps = [x for x in (_f(r, "motor_temp_C") for r in rows) if not math.isnan(x)]
+
+    summary = _aggregate(t, pos, torque)
+    summary.update({
+        "duration_s": (t[-1] - t[0]) if t else 0.0,
+        "samples": len(rows),
+        "temp_peak_C": max(temps) if temps else None,
+        "rep_list": [],
+    })
+    if not pos:
+        return summary
+
+    # A rep starts when position rises past REP_ENTER of the range, ends when it drops below REP_EXIT
+    lo, span = min(pos), (max(pos) - min(pos)) or 1.0
+    start = None  # last sample below REP_EXIT before the current excursion
+    in_rep = False
+    for i, p in enumerate(pos):
+        frac = (p - lo) / span
+        if not in_rep:
+            if frac < REP_EXIT:
+                start = i
+            elif frac >= REP_ENTER and start is not None:
+                in_rep = True
+        elif frac < REP_EXIT:
+            rep = _aggregate(t[start:i + 1], pos[start:i + 1], torque[start:i + 1])
+            rep.update({"t_start": t[start], "t_end": t[i]})
+            summary["rep_list"].append(rep)
+            in_rep = False
+            start = i
+    return summary
+
+
+def _bucket(session: SessionRef, period: str) -> str:
+    if period == "day":
+        return session.started.strftime("%Y-%m-%d")
+    year, week, _ = session.started.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+# ── Store ───────────────────────────────────────────────────────────────────
+
+class ProgressStore:
+    def __init__(self, path: Path = DEFAULT_DB, read_only: bool = False):
+        self.path = Path(path)
+        if read_only and self.path.is_file():
+            self.db = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            # A read-only store that doesn't exist yet reads as empty instead of creating the file
+            self.db = sqlite3.connect(":memory:" if read_only else self.path)
+            self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def has_session(self, name: str) -> bool:
+        return self.db.execute("SELECT 1 FROM sessions WHERE name = ?", (name,)).fetchone() is not None
+
+    def ingest(self, session: SessionRef) -> bool:
+        """Aggregate one session into the store; returns False if it was already ingested."""
+        if self.has_session(session.name):
+            return False
+        meta = session.read_meta() or {}
+        patient = str(meta.get("patient") or DEFAULT_PATIENT)
+        s = summarize_session(session.read_rows())
+        reps = s.pop("rep_list")
+
+        with self.db:
+            self.db.execute(
+                "INSERT INTO sessions VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                (session.name, patient, session.started.isoformat(), s["duration_s"], s["samples"],
+                 len(reps), s["peak_torque_Nm"], s["mean_torque_Nm"], s["work_J"], s["rom_deg"],
+                 s["temp_peak_C"]),
+            )
+            self.db.executemany(
+                "INSERT INTO reps VALUES (?,?,?,?,?,?,?,?)",
+                [(session.name, i, r["t_start"], r["t_end"], r["peak_torque_Nm"],
+                  r["mean_torque_Nm"], r["work_J"], r["rom_deg"]) for i, r in enumerate(reps)],
+            )
+            for period in PERIODS:
+                self.db.execute(
+                    """
+                    INSERT INTO rollups VALUES (?,?,?,1,?,?,?,?,?,?,?,?)
+                    ON CONFLICT (patient, period, bucket) DO UPDATE SET
+                        sessions = sessions + 1,
+                        reps = reps + excluded.reps,
+                        duration_s = duration_s + excluded.duration_s,
+                        peak_torque_Nm = max(peak_torque_Nm, excluded.peak_torque_Nm),
+                        torque_sum = torque_sum + excluded.torque_sum,
+                        torque_samples = torque_samples + excluded.torque_samples,
+                        work_J = work_J + excluded.work_J,
+                        rom_deg = max(rom_deg, excluded.rom_deg),
+                        temp_peak_C = max(coalesce(temp_peak_C, excluded.temp_peak_C),
+                                          coalesce(excluded.temp_peak_C, temp_peak_C))
+                    """,
+                    (patient, period, _bucket(session, period), len(reps), s["duration_s"],
+                     s["peak_torque_Nm"], s["torque_sum"], s["samples"], s["work_J"], s["rom_deg"],
+                     s["temp_peak_C"]),
+                )
+        return True
+
+    def ingest_dirs(self, log_dirs=DEFAULT_LOG_DIRS, before: Optional[datetime] = None) -> int:
+        """Ingest every not-yet-seen session under log_dirs; returns how many were added.
+
+        before skips sessions started at or after that time (e.g. one still being logged).
+        """
+        added = 0
+        for log_dir in log_dirs:
+            for session in iter_sessions(log_dir):
+                if before is not None and session.started >= before:
+                    continue
+                if not self.has_session(session.name) and self.ingest(session):
+                    added += 1
+        return added
+
+    def patients(self) -> List[str]:
+        return [r[0] for r in self.db.execute("SELECT DISTINCT patient FROM sessions ORDER BY patient")]
+
+    def trend(self, patient: str = DEFAULT_PATIENT, period: str = "week",
+              start: Optional[str] = None, end: Optional[str] = None) -> dict:
+        """Precomputed rollups as parallel arrays, oldest bucket first."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}'. Options: {list(PERIODS)}")
+        rows = self.db.execute(
+            """
+            SELECT bucket, sessions, reps, duration_s, peak_torque_Nm,
+                   torque_sum / max(torque_samples, 1), work_J, rom_deg, temp_peak_C
+            FROM rollups
+            WHERE patient = ? AND period = ? AND bucket >= ? AND bucket <= ?
+            ORDER BY bucket
+            """,
+            (patient, period, start or "", end or "9999"),
+        ).fetchall()
+        keys = ["bucket", "sessions", "reps", "duration_s", "peak_torque_Nm",
+                "mean_torque_Nm", "work_J", "rom_deg", "temp_peak_C"]
+        return {"patient": patient, "period": period,
+                **{k: [r[i] for r in rows] for i, k in enumerate(keys)}}
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Cross-session progress store")
+    p.add_argument("--db", type=str, default=str(DEFAULT_DB),
+                   help="SQLite store path (default: progress.sqlite in the data dir)")
+    p.add_argument("--log-dir", type=str, action="append", default=None,
+                   help="Log directory to ingest (repeatable; default: frontend/logs and logs)")
+    p.add_argument("--ingest", action="store_true",
+                   help="Ingest all sessions not yet in the store")
+    p.add_argument("--trend", type=str, default=None, choices=list(PERIODS),
+                   help="Print the daily or weekly trend")
+    p.add_argument("--patient", type=str, default=DEFAULT_PATIENT,
+                   help=f"Patient id for --trend (default: {DEFAULT_PATIENT})")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    store = ProgressStore(Path(args.db), read_only=not args.ingest)
+    try:
+        if args.ingest:
+            log_dirs = [Path(d) for d in args.log_dir] if args.log_dir else DEFAULT_LOG_DIRS
+            print(f"Ingested {store.ingest_dirs(log_dirs)} new session(s) into {args.db}")
+        if args.trend:
+            tr = store.trend(args.patient, args.trend)
+            if not tr["bucket"]:
+                print(f"No sessions for patient '{args.patient}'. Known: {store.patients()}")
+                sys.exit(1)
+            print(f"{'bucket':<11} {'sess':>4} {'reps':>5} {'peak Nm':>8} {'mean Nm':>8} "
+                  f"{'work J':>8} {'ROM°':>6} {'Tmax°C':>7}")
+            for i, b in enumerate(tr["bucket"]):
+                temp = tr["temp_peak_C"][i]
+                print(f"{b:<11} {tr['sessions'][i]:>4} {tr['reps'][i]:>5} "
+                      f"{tr['peak_torque_Nm'][i]:>8.2f} {tr['mean_torque_Nm'][i]:>8.2f} "
+                      f"{tr['work_J'][i]:>8.1f} {tr['rom_deg'][i]:>6.1f} "
+                      f"{temp if temp is not None else float('nan'):>7.1f}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,55 +2,249 @@
 """
 Simple Encoder Position Reader
 Displays real-time encoder position from AMT212B-V-OD
-Press Ctrl+C to exitaimport odrive
-odrv = odrive.find_any(timeout=10)
-axis = odrv.axis0
-m = axis.motor
-print([a for a in dir(m) if not a.startswith('_')])
+Press Ctrl+C to exit
+
+Capture mode (--capture FILE) samples pos_rel/vel as fast as the transport
+allows, stamps every sample with a monotonic host time and streams it into a
+compact binary file from a background writer thread. On exit it prints the
+achieved sample rate, inter-sample jitter, duplicate/stale ratio and how well
+the differentiated position agrees with the reported velocity.
+Use --report FILE to re-run the statistics on an existing capture.
 """
 
-import odrive
-import time
+import argparse
+import math
+import queue
+import struct
 import sys
+import threading
+import time
+from typing import List, Tuple
+
+# ── Capture File Format ─────────────────────────────────────────────────────
+# 8-byte magic, then fixed 16-byte little-endian records:
+#   float64 t_mono (s, time.perf_counter), float32 pos_rel (turns), float32 vel (turns/s)
+
+CAPTURE_MAGIC = b"BERRENC1"
+RECORD = struct.Struct("<dff")
+
+# Upper bin edges (ms) for the inter-sample jitter histogram
+JITTER_BINS_MS = [0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0]
+
+Sample = Tuple[float, float, float]
+
+
+class CaptureWriter:
+    """Background thread that drains samples from a queue into a capture file."""
+
+    def __init__(self, path: str, batch: int = 512):
+        self.path = path
+        self.batch = batch
+        self.queue: "queue.Queue[Sample | None]" = queue.Queue()
+        self.count = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "CaptureWriter":
+        self._thread.start()
+        return self
+
+    def put(self, t: float, pos: float, vel: float) -> None:
+        self.queue.put((t, pos, vel))
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        with open(self.path, "wb") as f:
+            f.write(CAPTURE_MAGIC)
+            buf = bytearray()
+            while True:
+                item = self.queue.get()
+                done = item is None
+                if not done:
+                    buf += RECORD.pack(*item)
+                    self.count += 1
+                # Flush in batches, or immediately once the queue runs dry
+                if done or len(buf) >= self.batch * RECORD.size or self.queue.empty():
+                    f.write(buf)
+                    buf.clear()
+                if done:
+                    break
+
+
+def read_capture(path: str) -> List[Sample]:
+    """Load every (t, pos, vel) record from a capture file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(CAPTURE_MAGIC):
+        print(f"ERROR: {path} is not an encoder capture file")
+        sys.exit(1)
+    body = data[len(CAPTURE_MAGIC):]
+    usable = len(body) - len(body) % RECORD.size  # tolerate a torn final record
+    return list(RECORD.iter_unpack(body[:usable]))
+
+
+# ── Capture Statistics ──────────────────────────────────────────────────────
+
+def print_report(samples: List[Sample]) -> None:
+    """Print rate, jitter histogram, stale ratio and derived-vs-reported velocity."""
+    n = len(samples)
+    if n < 2:
+        print("Not enough samples for a report.")
+        return
+
+    duration = samples[-1][0] - samples[0][0]
+    intervals = [(b[0] - a[0]) * 1000.0 for a, b in zip(samples, samples[1:])]
+    mean_dt = sum(intervals) / len(intervals)
+    std_dt = math.sqrt(sum((x - mean_dt) ** 2 for x in intervals) / len(intervals))
+    ordered = sorted(intervals)
+
+    print("\n=== Capture Report ===")
+    print(f"Samples: {n}  |  Duration: {duration:.2f} s  |  Rate: {(n - 1) / duration:.1f} Hz")
+    print(
+        f"Interval: mean={mean_dt:.3f} ms  std={std_dt:.3f} ms  "
+        f"min={ordered[0]:.3f} ms  p50={ordered[len(ordered) // 2]:.3f} ms  "
+        f"p99={ordered[int(len(ordered) * 0.99)]:.3f} ms  max={ordered[-1]:.3f} ms"
+    )
+
+    print("\nInter-sample jitter histogram:")
+    counts = [0] * (len(JITTER_BINS_MS) + 1)
+    for x in intervals:
+        for k, edge in enumerate(JITTER_BINS_MS):
+            if x <= edge:
+                counts[k] += 1
+                break
+        else:
+            counts[-1] += 1
+    peak = max(counts)
+    lo = 0.0
+    for k, c in enumerate(counts):
+        label = f"{lo:6.2f}-{JITTER_BINS_MS[k]:6.2f} ms" if k < len(JITTER_BINS_MS) else f"   > {lo:6.2f} ms  "
+        bar = "#" * (round(40 * c / peak) if peak else 0)
+        print(f"  {label} | {c:7d} {c / len(intervals):6.1%} {bar}")
+        if k < len(JITTER_BINS_MS):
+            lo = JITTER_BINS_MS[k]
+
+    # A sample is stale when neither position nor velocity changed since the last one
+    stale_pos = sum(1 for a, b in zip(samples, samples[1:]) if b[1] == a[1])
+    stale_both = sum(1 for a, b in zip(samples, samples[1:]) if b[1] == a[1] and b[2] == a[2])
+    print(f"\nStale position samples: {stale_pos / (n - 1):.1%}  |  Duplicate (pos+vel): {stale_both / (n - 1):.1%}")
+    unique = [samples[0]] + [b for a, b in zip(samples, samples[1:]) if b[1] != a[1]]
+    if len(unique) > 1:
+        u_dur = unique[-1][0] - unique[0][0]
+        print(f"Unique position updates: {len(unique)}  ({(len(unique) - 1) / u_dur:.1f} Hz effective)"
+              if u_dur > 0 else f"Unique position updates: {len(unique)}")
+
+    # Central difference over unique position updates vs the reported velocity
+    errors = []
+    for a, b, c in zip(unique, unique[1:], unique[2:]):
+        span = c[0] - a[0]
+        if span <= 0:
+            continue
+        derived = (c[1] - a[1]) / span
+        errors.append(derived - b[2])
+    if errors:
+        bias = sum(errors) / len(errors)
+        rms = math.sqrt(sum(e * e for e in errors) / len(errors))
+        print(f"Velocity (d pos/dt - reported): bias={bias:+.4f} t/s  rms={rms:.4f} t/s  "
+              f"max|err|={max(abs(e) for e in errors):.4f} t/s")
+
+
+# ── Modes ───────────────────────────────────────────────────────────────────
+
+def connect_axis():
+    """Connect to the ODrive, clear errors and return axis0."""
+    import odrive
+
+    print("\nSearching for ODrive...")
+    try:
+        odrv = odrive.find_any(timeout=10)
+        print(f"✓ Connected to ODrive\n")
+    except Exception as e:
+        print(f"✗ Failed to connect: {e}")
+        sys.exit(1)
+
+    odrv.clear_errors()
+    return odrv.axis0
+
+
+def run_display(axis) -> None:
+    print("Reading encoder position (turns)...")
+    print("Rotate the motor shaft to see values change")
+    print("Press Ctrl+C to exit\n")
+    print("-" * 50)
+
+    try:
+        while True:
+            # Read position in turns (1 turn = 360 degrees)
+            position = axis.pos_vel_mapper.pos_rel
+            velocity = axis.pos_vel_mapper.vel
+
+            # Convert to degrees for easier reading
+            degrees = position * 360
+
+            # Display with clear formatting
+            print(f"\rPosition: {position:8.3f} turns  |  {degrees:9.1f}°  |  Vel: {velocity:6.2f} turns/s", end='', flush=True)
+
+            time.sleep(0.05)  # Update at 20 Hz
+
+    except KeyboardInterrupt:
+        print("\n\n✓ Encoder reader stopped")
+
+
+def run_capture(axis, path: str, duration: float) -> None:
+    mapper = axis.pos_vel_mapper
+    writer = CaptureWriter(path).start()
+    print(f"Capturing to {path} as fast as possible"
+          + (f" for {duration:.1f} s" if duration > 0 else "") + " (Ctrl+C to stop)...")
+
+    t0 = time.perf_counter()
+    try:
+        while True:
+            pos = mapper.pos_rel
+            vel = mapper.vel
+            t = time.perf_counter()
+            writer.put(t, pos, vel)
+            if duration > 0 and t - t0 >= duration:
+                break
+    except KeyboardInterrupt:
+        pass
+
+    writer.close()
+    print(f"\n✓ Capture stopped: {writer.count} samples written to {path}")
+    # Report from the file so the capture loop holds nothing in memory
+    print_report(read_capture(path))
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="AMT21 encoder reader / high-rate capture")
+    p.add_argument("--capture", type=str, default=None,
+                   help="Binary file to stream timestamped samples into")
+    p.add_argument("--duration", type=float, default=0.0,
+                   help="Capture length in seconds (default: until Ctrl+C)")
+    p.add_argument("--report", type=str, default=None,
+                   help="Print statistics for an existing capture file and exit")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    if args.report:
+        print_report(read_capture(args.report))
+        return
+
+    print("=" * 50)
+    print("Encoder Position Reader")
+    print("=" * 50)
+
+    axis = connect_axis()
+    if args.capture:
+        run_capture(axis, args.capture, args.duration)
+    else:
+        run_display(axis)
+
 
-print("=" * 50)
-print("Encoder Position Reader")
-print("=" * 50)
-
-# Connect to ODrive
-print("\nSearching for ODrive...")
-try:
-    odrv = odrive.find_any(timeout=10)
-    print(f"✓ Connected to ODrive\n")
-except Exception as e:
-    print(f"✗ Failed to connect: {e}")
-    sys.exit(1)
-
-# Select axis
-axis = odrv.axis0
-
-# Clear any errors
-odrv.clear_errors()
-
-print("Reading encoder position (turns)...")
-print("Rotate the motor shaft to see values change")
-print("Press Ctrl+C to exit\n")
-print("-" * 50)
-
-try:
-    while True:
-        # Read position in turns (1 turn = 360 degrees)
-        position = axis.pos_vel_mapper.pos_rel
-        velocity = axis.pos_vel_mapper.vel
-        
-        # Convert to degrees for easier reading
-        degrees = position * 360
-        
-        # Display with clear formatting
-        print(f"\rPosition: {position:8.3f} turns  |  {degrees:9.1f}°  |  Vel: {velocity:6.2f} turns/s", end='', flush=True)
-        
-        time.sleep(0.05)  # Update at 20 Hz
-
-except KeyboardInterrupt:
-    print("\n\n✓ Encoder reader stopped")
-    sys.exit(0)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
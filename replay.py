@@ -0,0 +1,120 @@
+"""BERR EXO — Replay recorded sessions over the live websocket protocol.
+
+Used by `backend.py --replay <log>`: rows of a session CSV (plain or
+compressed, backend or tester format) are turned back into the same
+`telemetry` messages run_session() sends, paced at 1x, Nx or max speed and
+broadcast to every connected client. No ODrive required.
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict
+
+import websockets
+
+from session_log import session_for_path
+
+
+def _f(row: Dict[str, str], key: str, default: float = 0.0) -> float:
+    value = row.get(key)
+    try:
+        return float(value) if value not in (None, "") else default
+    except ValueError:
+        return default
+
+
+def row_to_telemetry(row: Dict[str, str], thermal_budget: bool = True) -> dict:
+    """Rebuild a live `telemetry` message from a logged CSV row."""
+    vbus = _f(row, "vbus_V")
+    ibus = _f(row, "ibus_A")
+    errors = row.get("active_errors", "0")
+    msg = {
+        "type": "telemetry",
+        "torque": round(_f(row, "commanded_torque_Nm"), 2),
+        "torque_estimate": round(_f(row, "torque_estimate_Nm"), 2),
+        "pos_deg": round(_f(row, "pos_deg"), 1),
+        "vel": round(_f(row, "velocity_turns_s"), 2),
+        "current": round(_f(row, "input_iq_A"), 2),
+        "motor_temp": round(_f(row, "motor_temp_C"), 1),
+        "fet_temp": round(_f(row, "fet_temp_C"), 1),
+        "power": round(vbus * ibus, 1),
+        "power_elec": round(_f(row, "power_elec_W"), 1),
+        "power_mech": round(_f(row, "power_mech_W"), 1),
+        "vbus": round(vbus, 1),
+        "curve_mult": round(_f(row, "curve_multiplier"), 2),
+        "vel_gain": round(_f(row, "vel_gain"), 3),
+        "active_errors": int(errors) if errors.isdigit() else errors,
+        "tick_ms": round(_f(row, "tick_ms"), 1),
+        "deadline_misses": int(_f(row, "deadline_misses")),
+        "rate_hz": round(_f(row, "rate_hz", 0.0)) or None,
+        "time": round(_f(row, "time_s"), 3),
+    }
+    if row.get("model_temp_C"):
+        ttl = _f(row, "time_to_limit_s")
+        msg["thermal"] = {
+            "model_temp": round(_f(row, "model_temp_C"), 1),
+            "scale": round(_f(row, "thermal_scale", 1.0), 3),
+            "enabled": thermal_budget,
+            "time_to_limit": None if ttl >= 1e6 else round(ttl),
+            "sustainable": round(min(_f(row, "sustainable_torque_Nm"), 99.0), 2),
+        }
+    return msg
+
+
+class Replay:
+    """A loaded session ready to be streamed."""
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        self.session = session_for_path(Path(path))
+        self.rows = self.session.read_rows()
+        self.meta = self.session.read_meta() or {}
+        self.speed = speed
+        self.loop = loop
+        if not self.rows:
+            raise ValueError(f"{path} contains no samples")
+        print(f"Replay: {self.session.name} ({len(self.rows)} rows, "
+              f"{_f(self.rows[-1], 'time_s'):.1f} s) at "
+              + ("max speed" if speed <= 0 else f"{speed:g}x"))
+
+    async def stream(self, clients: set, is_active, on_row=None) -> None:
+        """Broadcast every row to `clients` while is_active() holds.
+
+        on_row(t, row) is called per row (e.g. to feed the chart history).
+        Pacing follows the logged time_s; speed <= 0 sends as fast as the
+        event loop allows, yielding every few rows so commands still arrive.
+        """
+        loop = asyncio.get_running_loop()
+        websockets.broadcast(clients, json.dumps({
+            "type": "status", "message": "replay", "session": self.session.name, "meta": self.meta,
+        }))
+        sent = 0
+        t_base = 0.0  # keeps history time monotonic across --loop passes
+        wall_start = time.perf_counter()
+        while True:
+            t0_log = _f(self.rows[0], "time_s")
+            t0_wall = loop.time()
+            for i, row in enumerate(self.rows):
+                if not is_active():
+                    break
+                t_log = _f(row, "time_s") - t0_log
+                if self.speed > 0:
+                    delay = t0_wall + t_log / self.speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif i % 64 == 0:
+                    await asyncio.sleep(0)
+                if on_row is not None:
+                    on_row(t_base + t_log, row)
+                # Sessions logged before "thermal_budget" existed always derated
+                websockets.broadcast(clients, json.dumps(row_to_telemetry(row, self.meta.get("thermal_budget", True))))
+                sent += len(clients)
+            if not (self.loop and is_active()):
+                break
+            t_base += t_log + float(self.meta.get("dt_s", 0.02))
+
+        elapsed = time.perf_counter() - wall_start
+        print(f"Replay finished: {sent} messages to {len(clients)} client(s) in {elapsed:.2f} s "
+              f"({sent / elapsed if elapsed > 0 else 0:.0f} msg/s)")
+        websockets.broadcast(clients, json.dumps({"type": "status", "message": "stopped"}))
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""BERR EXO — Session log writing, reading and tiered retention.
+
+Logs are written as CSV, optionally through a streaming compressor. Every
+sync interval the buffered rows are emitted as one complete gzip member or
+zstd frame, so a file cut short by a crash still decodes up to the last sync
+point. Readers accept plain, gzip and zstd logs plus sessions consolidated
+into monthly archives, so analysis code never cares how a session is stored.
+
+Retention (run from cron or by hand):
+    python session_log.py --recompress-days 7 --archive-days 60
+  - sessions older than --recompress-days: plain CSVs are recompressed at max level
+  - sessions older than --archive-days: moved into archive/berr_exo_archive_YYYYMM.tar.xz
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tarfile
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+SESSION_RE = re.compile(r"^(berr_exo_log_(\d{8}_\d{6}))\.csv(\.gz|\.zst)?$")
+ARCHIVE_DIR = "archive"
+ARCHIVE_GLOB = "berr_exo_archive_*.tar.xz"
+
+# Data locations, anchored at the repo so every tool agrees regardless of cwd.
+# BERR_EXO_DATA_DIR moves them elsewhere (loadgen.py keeps stress sessions out of the real logs).
+ROOT = Path(__file__).resolve().parent
+DATA_ROOT = Path(os.environ.get("BERR_EXO_DATA_DIR") or ROOT)
+BACKEND_LOG_DIR = DATA_ROOT / "frontend" / "logs"   # backend.py sessions
+TESTER_LOG_DIR = DATA_ROOT / "logs"                 # tester.py runs
+DEFAULT_LOG_DIRS = [BACKEND_LOG_DIR, TESTER_LOG_DIR]
+
+
+# ── Writing ─────────────────────────────────────────────────────────────────
+
+def resolve_compression(compression: Optional[str]) -> Optional[str]:
+    """Validate a compression name, falling back to gzip when zstandard is missing."""
+    if compression in (None, "", "none"):
+        return None
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown log compression '{compression}'. Options: gzip, zstd, none")
+    if compression == "zstd" and zstandard is None:
+        print("WARNING: zstandard not installed, writing gzip logs instead")
+        return "gzip"
+    return compression
+
+
+def _compress(data: bytes, compression: str, level: Optional[int] = None) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=level or 6, mtime=0)
+    return zstandard.ZstdCompressor(level=level or 3).compress(data)
+
+
+class SessionLogWriter:
+    """CSV writer with optional streaming compression and periodic sync points.
+
+    Drop-in for csv.writer: call writerow() per tick and close() at the end.
+    `path` is the log path without compression suffix; the real file name is
+    available as `.path` after construction.
+    """
+
+    def __init__(self, path: Path, compression: Optional[str] = None, sync_interval: float = 5.0):
+        self.compression = resolve_compression(compression)
+        self.path = Path(str(path) + COMPRESSION_SUFFIXES[self.compression])
+        self.sync_interval = sync_interval
+        if self.compression is None:
+            self._file = open(self.path, "w", newline="")
+            self._writer = csv.writer(self._file)
+        else:
+            self._file = open(self.path, "wb")
+            self._buffer = io.StringIO()
+            self._writer = csv.writer(self._buffer)
+            self._last_sync = time.monotonic()
+
+    def writerow(self, row) -> None:
+        self._writer.writerow(row)
+        if self.compression is not None and time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self) -> None:
+        """Emit buffered rows as one self-contained compressed member/frame."""
+        if self.compression is None:
+            self._file.flush()
+            return
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._last_sync = time.monotonic()
+        if data:
+            self._file.write(_compress(data, self.compression))
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+
+# ── Reading ─────────────────────────────────────────────────────────────────
+
+def _trim_torn(chunk: bytes) -> bytes:
+    """Drop a trailing partial CSV line from a member/frame cut short by a crash."""
+    cut = chunk.rfind(b"\n")
+    return chunk[:cut + 1] if cut >= 0 else b""
+
+
+def decompress_tolerant(data: bytes, suffix: str) -> bytes:
+    """Decode a (possibly multi-member, possibly truncated) gzip/zstd log body."""
+    out = []
+    if suffix == ".gz":
+        while data:
+            d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                chunk = d.decompress(data)
+            except zlib.error:
+                break
+            if not d.eof:
+                out.append(_trim_torn(chunk))
+                break
+            out.append(chunk)
+            data = d.unused_data
+    elif suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst logs (pip install zstandard)")
+        dctx = zstandard.ZstdDecompressor()
+        while data:
+            d = dctx.decompressobj()
+            try:
+                chunk = d.decompress(data)
+            except zstandard.ZstdError:
+                break
+            if not d.eof:
+                out.append(_trim_torn(chunk))
+                break
+            out.append(chunk)
+            data = d.unused_data
+    else:
+        return data
+    return b"".join(out)
+
+
+def read_log_text(path: Path) -> str:
+    """Read a plain, .gz or .zst log file as text."""
+    path = Path(path)
+    return decompress_tolerant(path.read_bytes(), path.suffix).decode()
+
+
+@dataclass
+class SessionRef:
+    """One logged session, stored loose in a log dir or inside a monthly archive."""
+    name: str                       # e.g. berr_exo_log_20260225_124133
+    path: Path                      # CSV file, or the archive holding it
+    in_archive: bool = False
+
+    @property
+    def started(self) -> datetime:
+        return datetime.strptime(self.name[len("berr_exo_log_"):], "%Y%m%d_%H%M%S")
+
+    def read_text(self) -> str:
+        if self.in_archive:
+            with tarfile.open(self.path, "r:xz") as tar:
+                return tar.extractfile(f"{self.name}.csv").read().decode()
+        return read_log_text(self.path)
+
+    def read_meta(self) -> Optional[dict]:
+        if self.in_archive:
+            with tarfile.open(self.path, "r:xz") as tar:
+                try:
+                    return json.load(tar.extractfile(f"{self.name}_meta.json"))
+                except KeyError:
+                    return None
+        meta_path = self.path.with_name(f"{self.name}_meta.json")
+        if not meta_path.is_file():
+            return None
+        with open(meta_path) as mf:
+            return json.load(mf)
+
+    def read_rows(self) -> List[Dict[str, str]]:
+        return list(csv.DictReader(io.StringIO(self.read_text())))
+
+
+def session_for_path(path: Path) -> SessionRef:
+    """SessionRef for a single loose CSV / .csv.gz / .csv.zst file."""
+    path = Path(path)
+    m = SESSION_RE.match(path.name)
+    name = m.group(1) if m else path.name.split(".csv")[0]
+    return SessionRef(name, path)
+
+
+def iter_sessions(log_dir: Path, include_archives: bool = True) -> List[SessionRef]:
+    """All sessions under log_dir (loose files and archives), oldest first."""
+    log_dir = Path(log_dir)
+    sessions: List[SessionRef] = []
+    if not log_dir.is_dir():
+        return sessions
+    for p in log_dir.iterdir():
+        m = SESSION_RE.match(p.name)
+        if m and p.is_file():
+            sessions.append(SessionRef(m.group(1), p))
+    if include_archives:
+        for archive in sorted((log_dir / ARCHIVE_DIR).glob(ARCHIVE_GLOB)):
+            with tarfile.open(archive, "r:xz") as tar:
+                for member in tar.getnames():
+                    m = SESSION_RE.match(member)
+                    if m:
+                        sessions.append(SessionRef(m.group(1), archive, in_archive=True))
+    sessions.sort(key=lambda s: s.name)
+    return sessions
+
+
+def add_session_args(p: argparse.ArgumentParser) -> None:
+    """Session selection arguments shared by the analysis CLIs (see select_sessions)."""
+    p.add_argument("logs", nargs="*",
+                   help="Session CSV files (.csv/.gz/.zst); default: every session in the log dirs")
+    p.add_argument("--log-dir", type=str, action="append", default=None,
+                   help="Log directory to scan when no files are given (repeatable; default: frontend/logs and logs)")
+
+
+def select_sessions(args: argparse.Namespace) -> List[SessionRef]:
+    """Sessions named by add_session_args' arguments; exits if there are none."""
+    if args.logs:
+        missing = [p for p in args.logs if not Path(p).is_file()]
+        if missing:
+            print(f"ERROR: not found: {', '.join(missing)}")
+            sys.exit(1)
+        sessions = [session_for_path(Path(p)) for p in args.logs]
+    else:
+        log_dirs = [Path(d) for d in args.log_dir] if args.log_dir else DEFAULT_LOG_DIRS
+        sessions = [s for d in log_dirs for s in iter_sessions(d)]
+    if not sessions:
+        print("No sessions found.")
+        sys.exit(1)
+    return sessions
+
+
+# ── Retention ───────────────────────────────────────────────────────────────
+
+def _archive_sessions(archive: Path, sessions: List[SessionRef], dry_run: bool) -> None:
+    """Add sessions (csv + meta) to a monthly tar.xz, rewriting it atomically."""
+    members: Dict[str, bytes] = {}
+    if archive.exists():
+        with tarfile.open(archive, "r:xz") as tar:
+            for m in tar.getmembers():
+                members[m.name] = tar.extractfile(m).read()
+    for s in sessions:
+        members[f"{s.name}.csv"] = s.read_text().encode()
+        meta_path = s.path.with_name(f"{s.name}_meta.json")
+        if meta_path.is_file():
+            members[meta_path.name] = meta_path.read_bytes()
+    print(f"  archive {archive.name}: +{len(sessions)} session(s), {len(members)} member(s)")
+    if dry_run:
+        return
+
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    tmp = archive.with_name(archive.name + ".tmp")
+    with tarfile.open(tmp, "w:xz", preset=9) as tar:
+        for name in sorted(members):
+            info = tarfile.TarInfo(name)
+            info.size = len(members[name])
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(members[name]))
+    os.replace(tmp, archive)
+    for s in sessions:
+        s.path.unlink()
+        s.path.with_name(f"{s.name}_meta.json").unlink(missing_ok=True)
+
+
+def apply_retention(
+    log_dir: Path,
+    recompress_days: Optional[float],
+    archive_days: Optional[float],
+    compression: str = "gzip",
+    dry_run: bool = False,
+) -> None:
+    """Recompress plain CSVs older than recompress_days; archive sessions older than archive_days."""
+    log_dir = Path(log_dir)
+    compression = resolve_compression(compression) or "gzip"
+    now = datetime.now()
+    to_archive: Dict[str, List[SessionRef]] = {}
+
+    for s in iter_sessions(log_dir, include_archives=False):
+        age_days = (now - s.started).total_seconds() / 86400
+        if archive_days is not None and age_days >= archive_days:
+            to_archive.setdefault(s.name[len("berr_exo_log_"):][:6], []).append(s)
+        elif recompress_days is not None and age_days >= recompress_days and s.path.suffix == ".csv":
+            data = s.path.read_bytes()
+            dest = Path(str(s.path) + COMPRESSION_SUFFIXES[compression])
+            packed = _compress(data, compression, level=9 if compression == "gzip" else 19)
+            print(f"  recompress {s.path.name}: {len(data)} -> {len(packed)} bytes")
+            if not dry_run:
+                tmp = dest.with_name(dest.name + ".tmp")
+                tmp.write_bytes(packed)
+                os.replace(tmp, dest)
+                s.path.unlink()
+
+    for month, sessions in sorted(to_archive.items()):
+        _archive_sessions(log_dir / ARCHIVE_DIR / f"berr_exo_archive_{month}.tar.xz", sessions, dry_run)
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Session log retention")
+    p.add_argument("--log-dir", type=str, action="append", default=None,
+                   help="Log directory (repeatable; default: frontend/logs and logs)")
+    p.add_argument("--recompress-days", type=float, default=7.0,
+                   help="Recompress plain CSV sessions older than this (default: 7)")
+    p.add_argument("--archive-days", type=float, default=None,
+                   help="Consolidate sessions older than this into monthly archives (default: off)")
+    p.add_argument("--compression", type=str, default="gzip", choices=["gzip", "zstd"],
+                   help="Compressor for recompressed sessions (default: gzip)")
+    p.add_argument("--dry-run", action="store_true",
+                   help="Only print what would be done")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    log_dirs = [Path(d) for d in args.log_dir] if args.log_dir else DEFAULT_LOG_DIRS
+    for log_dir in log_dirs:
+        if not log_dir.is_dir():
+            print(f"Skipping {log_dir} (not found)")
+            continue
+        print(f"{log_dir}:")
+        try:
+            apply_retention(log_dir, args.recompress_days, args.archive_days,
+                            args.compression, args.dry_run)
+        except (OSError, RuntimeError) as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
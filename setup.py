@@ -1,22 +1,180 @@
 #!/usr/bin/env python3
 """ODrive Pro setup script - D6374 + AMT21xB encoder + thermistor
-Run once with motor FREE TO SPIN (detached from arm), then never again."""
+Run once with motor FREE TO SPIN (detached from arm), then never again.
+
+The script is idempotent: TARGET_CONFIG is compared against the device and
+only differing keys are written (and saved), calibration is skipped when valid
+results already persist, and reboots are waited out by polling instead of
+fixed sleeps. Re-running it on a provisioned unit takes seconds.
+Use --erase / --recalibrate to force the old from-scratch behaviour."""
+import argparse
+import math
 import odrive
 from odrive.enums import *
 import time
 import sys
 
+# ── Target Configuration ──
+# Attribute paths are relative to the ODrive object. Values are compared with
+# float tolerance (the device stores float32) and enums by integer value.
+TARGET_CONFIG = [
+    # === MOTOR CONFIG ===
+    ("axis0.config.motor.motor_type", MotorType.HIGH_CURRENT),
+    ("axis0.config.motor.pole_pairs", 7),
+    ("axis0.config.motor.torque_constant", 8.27 / 149),
+    ("axis0.config.motor.calibration_current", 5.0),
+    ("axis0.config.motor.resistance_calib_max_voltage", 4.0),
+    ("axis0.config.motor.current_soft_max", 60.0),
+    ("axis0.config.motor.current_hard_max", 80.0),
+
+    # === THERMISTOR CONFIG ===
+    ("axis0.motor.motor_thermistor.config.enabled", True),
+    ("axis0.motor.motor_thermistor.config.r_ref", 10000),
+    ("axis0.motor.motor_thermistor.config.beta", 3435),
+    ("axis0.motor.motor_thermistor.config.temp_limit_lower", 100.0),
+    ("axis0.motor.motor_thermistor.config.temp_limit_upper", 130.0),
+
+    # === RS485 ENCODER (AMT21xB-V-OD) ===
+    ("rs485_encoder_group0.config.mode", Rs485EncoderMode.AMT21_EVENT_DRIVEN),
+    ("axis0.config.load_encoder", EncoderId.RS485_ENCODER0),
+    ("axis0.config.commutation_encoder", EncoderId.RS485_ENCODER0),
+
+    # === CALIBRATION LOCKIN ===
+    ("axis0.config.calibration_lockin.current", 5.0),
+    ("axis0.config.calibration_lockin.vel", 20.0),
+    ("axis0.config.calibration_lockin.ramp_distance", 3.14),
+    ("axis0.config.calibration_lockin.ramp_time", 0.4),
+    ("axis0.config.calibration_lockin.accel", 20.0),
+
+    # === CONTROLLER CONFIG ===
+    ("axis0.controller.config.control_mode", ControlMode.TORQUE_CONTROL),
+    ("axis0.controller.config.input_mode", InputMode.PASSTHROUGH),
+]
+
+# Changing any of these invalidates stored motor / encoder calibration
+MOTOR_CAL_PREFIXES = ("axis0.config.motor.",)
+ENCODER_CAL_PREFIXES = ("axis0.config.commutation_encoder", "rs485_encoder_group0.", "axis0.config.motor.pole_pairs")
+
+
+# ── Device Access Helpers ──
+
+def get_path(obj, path):
+    for name in path.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def set_path(obj, path, value):
+    *parents, name = path.split(".")
+    for p in parents:
+        obj = getattr(obj, p)
+    setattr(obj, name, value)
+
+
+def values_match(actual, target):
+    if isinstance(target, bool):
+        return bool(actual) == target
+    if isinstance(target, float):
+        return math.isclose(float(actual), target, rel_tol=1e-5, abs_tol=1e-6)
+    return int(actual) == int(target)
+
+
+def config_diff(odrv):
+    """Return [(path, actual, target)] for every key that differs from TARGET_CONFIG."""
+    diff = []
+    for path, target in TARGET_CONFIG:
+        actual = get_path(odrv, path)
+        if not values_match(actual, target):
+            diff.append((path, actual, target))
+    return diff
+
+
+def poll_until(predicate, timeout, what, initial=0.05, max_interval=1.0):
+    """Poll predicate() with exponential backoff; return True once it holds, False on timeout."""
+    deadline = time.monotonic() + timeout
+    interval = initial
+    while True:
+        try:
+            if predicate():
+                return True
+        except Exception:
+            pass  # device may be mid-reboot
+        if time.monotonic() >= deadline:
+            print(f"TIMEOUT waiting for {what}")
+            return False
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        interval = min(interval * 2, max_interval)
+
+
+def wait_for_device(old, serial_number, timeout=30.0):
+    """Reconnect after a reboot: wait for `old` to drop off the bus, then poll the new device."""
+    print("Waiting for reboot...")
+
+    def gone():
+        try:
+            old.vbus_voltage
+        except Exception:
+            return True  # the pre-reboot object is lost once the device disconnects
+        return False
+
+    if not poll_until(gone, 10.0, "ODrive to reboot"):
+        sys.exit(1)
+
+    print("Reconnecting...")
+    found = {}
+
+    def ready():
+        odrv = odrive.find_any(serial_number=serial_number, timeout=1.0)
+        if odrv is None or odrv is old:
+            return False
+        odrv.vbus_voltage  # first property read succeeds only once the device is up
+        if odrv.axis0.current_state != AxisState.IDLE:
+            return False
+        found["odrv"] = odrv
+        return True
+
+    if not poll_until(ready, timeout, "ODrive to come back"):
+        sys.exit(1)
+    return found["odrv"]
+
+
 def save_and_reconnect(odrv, msg="Saving configuration..."):
     print(msg)
+    serial = odrv.serial_number
     try:
         odrv.save_configuration()
     except Exception:
         pass
-    time.sleep(5)
-    print("Reconnecting...")
-    return odrive.find_any(timeout=10)
+    return wait_for_device(odrv, serial)
+
+
+def run_procedure(odrv, axis, state, timeout):
+    """Request a calibration state and wait (by polling) for the axis to return to IDLE."""
+    odrv.clear_errors()
+    axis.requested_state = state
+    # The axis may take a moment to leave IDLE; don't mistake that for completion
+    poll_until(lambda: axis.current_state != AxisState.IDLE, 2.0, "procedure to start")
+    if not poll_until(lambda: axis.current_state == AxisState.IDLE, timeout, "procedure to finish"):
+        sys.exit(1)
+
+
+def motor_calibrated(axis):
+    return axis.config.motor.phase_resistance >= 0.001 and axis.config.motor.phase_inductance >= 0.000001
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Idempotent ODrive Pro setup for BERR Exo")
+    p.add_argument("--erase", action="store_true",
+                   help="Erase configuration first (full from-scratch setup)")
+    p.add_argument("--recalibrate", action="store_true",
+                   help="Re-run motor and encoder calibration even if valid results persist")
+    p.add_argument("--yes", action="store_true",
+                   help="Don't prompt before encoder calibration (fleet provisioning)")
+    return p.parse_args()
+
 
 def main() -> None:
+    args = parse_args()
     print("Connecting to ODrive...")
     try:
         odrv = odrive.find_any(timeout=10)
@@ -24,122 +182,101 @@ def main() -> None:
         print(f"Failed to connect to ODrive: {exc}")
         sys.exit(1)
     print(f"Found ODrive {odrv.serial_number}")
+    serial = odrv.serial_number
 
-    # === ERASE OLD CONFIG ===
-    print("Erasing old configuration...")
-    try:
-        odrv.erase_configuration()
-    except Exception:
-        pass
-    time.sleep(5)
-    print("Reconnecting...")
-    odrv = odrive.find_any(timeout=10)
-    axis = odrv.axis0
-
-    # === MOTOR CONFIG ===
-    axis.config.motor.motor_type = MotorType.HIGH_CURRENT
-    axis.config.motor.pole_pairs = 7
-    axis.config.motor.torque_constant = 8.27 / 149
-    axis.config.motor.calibration_current = 5.0
-    axis.config.motor.resistance_calib_max_voltage = 4.0
-    axis.config.motor.current_soft_max = 60.0
-    axis.config.motor.current_hard_max = 80.0
-
-    # === THERMISTOR CONFIG ===
-    axis.motor.motor_thermistor.config.enabled = True
-    axis.motor.motor_thermistor.config.r_ref = 10000
-    axis.motor.motor_thermistor.config.beta = 3435
-    axis.motor.motor_thermistor.config.temp_limit_lower = 100.0
-    axis.motor.motor_thermistor.config.temp_limit_upper = 130.0
+    # === ERASE OLD CONFIG (only on request) ===
+    if args.erase:
+        print("Erasing old configuration...")
+        try:
+            odrv.erase_configuration()
+        except Exception:
+            pass
+        odrv = wait_for_device(odrv, serial)
 
-    # === RS485 ENCODER (AMT21xB-V-OD) ===
-    odrv.rs485_encoder_group0.config.mode = Rs485EncoderMode.AMT21_EVENT_DRIVEN
-    axis.config.load_encoder = EncoderId.RS485_ENCODER0
-    axis.config.commutation_encoder = EncoderId.RS485_ENCODER0
-
-    # === CALIBRATION LOCKIN ===
-    axis.config.calibration_lockin.current = 5.0
-    axis.config.calibration_lockin.vel = 20.0
-    axis.config.calibration_lockin.ramp_distance = 3.14
-    axis.config.calibration_lockin.ramp_time = 0.4
-    axis.config.calibration_lockin.accel = 20.0
-
-    # === CONTROLLER CONFIG ===
-    axis.controller.config.control_mode = ControlMode.TORQUE_CONTROL
-    axis.controller.config.input_mode = InputMode.PASSTHROUGH
-
-    # === SAVE & REBOOT ===
-    odrv = save_and_reconnect(odrv)
+    # === APPLY ONLY DIFFERING CONFIG ===
+    diff = config_diff(odrv)
+    if diff:
+        print(f"\n{len(diff)} config key(s) differ from target:")
+        for path, actual, target in diff:
+            print(f"  {path}: {actual} -> {target}")
+            set_path(odrv, path, target)
+        odrv = save_and_reconnect(odrv)
+    else:
+        print("\nConfiguration already matches target ✓")
     axis = odrv.axis0
 
-    # === MOTOR CALIBRATION ===
-    print("\nRunning motor calibration (motor should beep)...")
-    odrv.clear_errors()
-    axis.requested_state = AxisState.MOTOR_CALIBRATION
-    time.sleep(1)
-
+    changed = [path for path, _, _ in diff]
+    need_motor_cal = (
+        args.recalibrate
+        or not motor_calibrated(axis)
+        or any(p.startswith(MOTOR_CAL_PREFIXES) for p in changed)
+    )
+    need_encoder_cal = (
+        args.recalibrate
+        or need_motor_cal
+        or not axis.commutation_mapper.config.offset_valid
+        or any(p.startswith(ENCODER_CAL_PREFIXES) for p in changed)
+    )
     timeout = 20
-    start = time.time()
-    while axis.current_state != AxisState.IDLE:
-        time.sleep(0.5)
-        if time.time() - start > timeout:
-            print("TIMEOUT")
-            sys.exit(1)
-
-    if axis.active_errors:
-        print(f"Motor calibration FAILED: {axis.active_errors}")
-        print(f"  procedure_result: {axis.procedure_result}")
-        sys.exit(1)
 
-    r = axis.config.motor.phase_resistance
-    l = axis.config.motor.phase_inductance
-    print(f"  Phase resistance: {r:.4f} Ω")
-    print(f"  Phase inductance: {l:.6f} H")
+    # === MOTOR CALIBRATION ===
+    if need_motor_cal:
+        print("\nRunning motor calibration (motor should beep)...")
+        run_procedure(odrv, axis, AxisState.MOTOR_CALIBRATION, timeout)
 
-    if r < 0.001 or l < 0.000001:
-        print("ERROR: Zero calibration values - motor didn't calibrate!")
-        sys.exit(1)
-    print("Motor calibration OK ✓")
+        if axis.active_errors:
+            print(f"Motor calibration FAILED: {axis.active_errors}")
+            print(f"  procedure_result: {axis.procedure_result}")
+            sys.exit(1)
 
-    # === ENCODER OFFSET CALIBRATION ===
-    # MOTOR MUST BE FREE TO SPIN FOR THIS STEP
-    input("\nEnsure motor is FREE TO SPIN (detached from arm), press Enter...")
-    print("Running encoder offset calibration...")
-    odrv.clear_errors()
-    axis.requested_state = AxisState.ENCODER_OFFSET_CALIBRATION
+        r = axis.config.motor.phase_resistance
+        l = axis.config.motor.phase_inductance
+        print(f"  Phase resistance: {r:.4f} Ω")
+        print(f"  Phase inductance: {l:.6f} H")
 
-    start = time.time()
-    while axis.current_state != AxisState.IDLE:
-        time.sleep(0.5)
-        if time.time() - start > timeout:
-            print("TIMEOUT")
+        if not motor_calibrated(axis):
+            print("ERROR: Zero calibration values - motor didn't calibrate!")
             sys.exit(1)
+        print("Motor calibration OK ✓")
+    else:
+        print("Motor calibration already valid, skipping ✓")
 
-    print(f"  procedure_result: {axis.procedure_result}")
-    print(f"  commutation offset: {axis.commutation_mapper.config.offset}")
-    print(f"  offset_valid: {axis.commutation_mapper.config.offset_valid}")
+    # === ENCODER OFFSET CALIBRATION ===
+    if need_encoder_cal:
+        # MOTOR MUST BE FREE TO SPIN FOR THIS STEP
+        if not args.yes:
+            input("\nEnsure motor is FREE TO SPIN (detached from arm), press Enter...")
+        print("Running encoder offset calibration...")
+        run_procedure(odrv, axis, AxisState.ENCODER_OFFSET_CALIBRATION, timeout)
 
-    if not axis.commutation_mapper.config.offset_valid:
-        print("ENCODER CALIBRATION FAILED - offset not valid!")
-        print(f"  active_errors: {axis.active_errors}")
         print(f"  procedure_result: {axis.procedure_result}")
-        sys.exit(1)
-    print("Encoder calibration OK ✓")
+        print(f"  commutation offset: {axis.commutation_mapper.config.offset}")
+        print(f"  offset_valid: {axis.commutation_mapper.config.offset_valid}")
 
-    # === SAVE CALIBRATION ===
-    odrv = save_and_reconnect(odrv, "Saving calibration...")
-    axis = odrv.axis0
+        if not axis.commutation_mapper.config.offset_valid:
+            print("ENCODER CALIBRATION FAILED - offset not valid!")
+            print(f"  active_errors: {axis.active_errors}")
+            print(f"  procedure_result: {axis.procedure_result}")
+            sys.exit(1)
+        print("Encoder calibration OK ✓")
+    else:
+        print("Encoder offset already valid, skipping ✓")
 
-    # === VERIFY OFFSET PERSISTED ===
-    if not axis.commutation_mapper.config.offset_valid:
-        print("ERROR: Offset didn't survive reboot!")
-        sys.exit(1)
+    if need_motor_cal or need_encoder_cal:
+        # === SAVE CALIBRATION ===
+        odrv = save_and_reconnect(odrv, "Saving calibration...")
+        axis = odrv.axis0
+
+        # === VERIFY OFFSET PERSISTED ===
+        if not axis.commutation_mapper.config.offset_valid:
+            print("ERROR: Offset didn't survive reboot!")
+            sys.exit(1)
 
     # === TEST CLOSED LOOP ===
     print("\nTesting closed-loop control...")
     odrv.clear_errors()
     axis.requested_state = AxisState.CLOSED_LOOP_CONTROL
-    time.sleep(0.5)
+    poll_until(lambda: axis.current_state == AxisState.CLOSED_LOOP_CONTROL, 0.5, "closed loop")
 
     if axis.current_state == AxisState.CLOSED_LOOP_CONTROL:
         print("Closed-loop control OK ✓")
@@ -169,8 +306,8 @@ def main() -> None:
         f"limit={axis.motor.motor_thermistor.config.temp_limit_upper}°C"
     )
     print("\n✓ Setup complete! Motor can be reattached to arm.")
-    print("  Run this setup again ONLY if you reflash firmware or erase config.")
+    print("  Re-running is safe: only differing keys are written and valid calibration is kept.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
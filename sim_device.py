@@ -0,0 +1,221 @@
+"""BERR EXO — Simulated ODrive for running the backend without hardware.
+
+Used by `backend.py --simulate` (and loadgen.py). SimulatedODrive exposes
+the subset of the ODrive API that backend.py touches, on the same attribute
+paths. Behind it is a 1-DOF arm: rotor + arm inertia, viscous friction, the
+motor torque from torque or velocity control, and a simulated patient that
+tracks a periodic rep trajectory through the ROM with a PD "muscle".
+Physics is integrated lazily in 1 ms steps up to the current time whenever
+a property is read. Every property access also blocks for `usb_latency` to
+mimic fibre round trips, so tick timing behaves like the real link.
+
+The device watchdog is modelled too: if it is enabled and not fed within
+watchdog_timeout, the axis drops to IDLE and reports WATCHDOG_TIMER_EXPIRED.
+Expiry is judged from the time of the last feed, on every feed, state read and
+physics step, so a late feed cannot rescue an axis that has already tripped.
+
+Like the real ODrive in torque control, motor.input_iq (the Iq setpoint
+input) reads 0; the delivered current shows up in torque_estimate. Pass
+report_iq=True to have input_iq report the simulated Iq instead.
+"""
+
+import math
+import random
+import time
+
+from odrive.enums import AxisState, ControlMode
+
+WATCHDOG_TIMER_EXPIRED = 0x800
+STEP_S = 0.001
+
+
+def _peek(node, path: str):
+    """Read a facade attribute without paying the simulated USB latency."""
+    for name in path.split("."):
+        node = object.__getattribute__(node, name)
+    return node
+
+
+class _Sim:
+    """Shared physics state behind the attribute facade."""
+
+    def __init__(self, seed: int, usb_latency: float, rep_period: float, rom_turns: float):
+        self.rng = random.Random(seed)
+        self.usb_latency = usb_latency
+        self.rep_period = rep_period
+        self.rom = rom_turns
+        self.inertia = 0.02         # kg·m², arm + rotor reflected
+        self.friction = 0.05        # Nm·s/turn
+        self.kt = 8.27 / 149
+        self.phase_resistance = 0.1
+        self.t0 = time.perf_counter()
+        self.t = 0.0
+        self.pos = 0.0              # turns
+        self.vel = 0.0              # turns/s
+        self.motor_torque = 0.0
+        self.temp = 25.0
+        self.fet_temp = 25.0
+        self.state = AxisState.IDLE
+        self.errors = 0
+        self.last_feed = self.t0
+
+    def io(self) -> None:
+        if self.usb_latency > 0:
+            time.sleep(self.usb_latency)
+
+    def check_watchdog(self, axis, now: float):
+        """Trip the watchdog if it ran out before now; return the sim time it expired at."""
+        timeout = _peek(axis, "config.watchdog_timeout")
+        if (_peek(axis, "config.enable_watchdog") and self.state == AxisState.CLOSED_LOOP_CONTROL
+                and now - self.last_feed > timeout):
+            self.state = AxisState.IDLE
+            self.errors |= WATCHDOG_TIMER_EXPIRED
+            return self.last_feed + timeout - self.t0
+        return None
+
+    def advance(self, axis) -> None:
+        now = time.perf_counter()
+        expired_at = self.check_watchdog(axis, now)
+        velocity_mode = _peek(axis, "controller.config.control_mode") == ControlMode.VELOCITY_CONTROL
+        vel_gain = _peek(axis, "controller.config.vel_gain")
+        input_vel = _peek(axis, "controller.input_vel")
+        input_torque = _peek(axis, "controller.input_torque")
+        target_t = now - self.t0
+        while self.t + STEP_S <= target_t:
+            self.t += STEP_S
+            if self.state != AxisState.CLOSED_LOOP_CONTROL and (expired_at is None or self.t > expired_at):
+                tau_m = 0.0
+            elif velocity_mode:
+                tau_m = vel_gain * (input_vel - self.vel) + input_torque
+            else:
+                tau_m = input_torque
+            tau_m = max(-3.3, min(3.3, tau_m))
+            # Patient: PD tracking of a raised-cosine rep with a rest between reps
+            phase = (self.t % self.rep_period) / self.rep_period
+            ref = self.rom * 0.5 * (1 - math.cos(2 * math.pi * min(1.0, phase / 0.8)))
+            tau_p = 40.0 * (ref - self.pos) - 4.0 * self.vel + self.rng.gauss(0.0, 0.05)
+            tau_p = max(-6.0, min(6.0, tau_p))
+            acc = (tau_m + tau_p - self.friction * self.vel) / self.inertia / (2 * math.pi)
+            self.vel += acc * STEP_S
+            self.pos += self.vel * STEP_S
+            iq = tau_m / self.kt
+            self.temp += STEP_S * (1.5 * self.phase_resistance * iq * iq - (self.temp - 25.0) / 1.5) / 200.0
+            self.fet_temp += STEP_S * (0.02 * iq * iq - (self.fet_temp - 25.0) / 2.0) / 100.0
+            self.motor_torque = tau_m
+
+
+class _Node:
+    """Attribute container whose reads cost one simulated USB round trip."""
+
+    def __init__(self, sim: _Sim, getters=None, setters=None, **attrs):
+        object.__setattr__(self, "_sim", sim)
+        object.__setattr__(self, "_getters", getters or {})
+        object.__setattr__(self, "_setters", setters or {})
+        for k, v in attrs.items():
+            object.__setattr__(self, k, v)
+
+    def __getattribute__(self, name):
+        if name.startswith("_"):
+            return object.__getattribute__(self, name)
+        sim = object.__getattribute__(self, "_sim")
+        getters = object.__getattribute__(self, "_getters")
+        if name in getters:
+            sim.io()
+            return getters[name]()
+        value = object.__getattribute__(self, name)
+        if not isinstance(value, _Node) and not callable(value):
+            sim.io()
+        return value
+
+    def __setattr__(self, name, value):
+        setters = object.__getattribute__(self, "_setters")
+        if name in setters:
+            setters[name](value)
+            return
+        object.__getattribute__(self, "_sim").io()
+        object.__setattr__(self, name, value)
+
+
+class SimulatedODrive:
+    """Stands in for `odrive.find_any()`'s device object."""
+
+    def __init__(self, seed: int = 0, usb_latency: float = 0.0003, rep_period: float = 4.0,
+                 rom_deg: float = 100.0, report_iq: bool = False):
+        sim = self._sim = _Sim(seed, usb_latency, rep_period, rom_deg / 360.0)
+
+        def step():
+            sim.advance(self.axis0)
+
+        def pos():
+            step()
+            return sim.pos
+
+        def vel():
+            step()
+            return sim.vel + sim.rng.gauss(0.0, 0.002)
+
+        def torque():
+            step()
+            return sim.motor_torque
+
+        def state():
+            step()
+            return sim.state
+
+        def errors():
+            step()
+            return sim.errors
+
+        def feed():
+            sim.io()
+            step()  # a feed after expiry does not re-arm the axis
+            sim.last_feed = time.perf_counter()
+
+        def request_state(state):
+            sim.io()
+            step()
+            if state == AxisState.CLOSED_LOOP_CONTROL:
+                sim.errors = 0
+                sim.last_feed = time.perf_counter()
+            sim.state = state
+
+        thermistor_cfg = _Node(sim, temp_limit_lower=100.0, temp_limit_upper=130.0)
+        motor = _Node(sim, getters={
+            "input_iq": (lambda: torque() / sim.kt) if report_iq else (lambda: 0.0),
+            "torque_estimate": torque,
+            "electrical_power": lambda: 1.5 * sim.phase_resistance * (torque() / sim.kt) ** 2
+                                        + torque() * sim.vel * 2 * math.pi,
+            "mechanical_power": lambda: torque() * sim.vel * 2 * math.pi,
+        },
+            motor_thermistor=_Node(sim, {"temperature": lambda: sim.temp}, config=thermistor_cfg),
+            fet_thermistor=_Node(sim, {"temperature": lambda: sim.fet_temp}),
+        )
+        controller = _Node(sim, input_torque=0.0, input_vel=0.0, config=_Node(
+            sim, control_mode=ControlMode.TORQUE_CONTROL, input_mode=None,
+            vel_gain=0.2, vel_integrator_gain=0.4,
+        ))
+        self.axis0 = _Node(sim, {
+            "current_state": state,
+            "active_errors": errors,
+        }, {"requested_state": request_state},
+            pos_vel_mapper=_Node(sim, {"pos_rel": pos, "vel": vel}),
+            controller=controller,
+            motor=motor,
+            config=_Node(sim, watchdog_timeout=0.2, enable_watchdog=False, motor=_Node(
+                sim, phase_resistance=sim.phase_resistance, torque_constant=sim.kt)),
+            watchdog_feed=feed,
+        )
+
+    @property
+    def vbus_voltage(self) -> float:
+        self._sim.io()
+        return 24.0 - 0.05 * abs(self._sim.motor_torque / self._sim.kt)
+
+    @property
+    def ibus(self) -> float:
+        self._sim.io()
+        return self._sim.motor_torque * self._sim.vel * 2 * math.pi / 24.0
+
+    def clear_errors(self) -> None:
+        self._sim.io()
+        self._sim.errors = 0
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""BERR EXO — Shared-memory telemetry tap.
+
+The backend publishes every control tick into a named shared-memory ring of
+fixed-size records. Any local process (Jupyter, plotting scripts) can attach
+read-only and view the ring as a NumPy structured array without copies;
+sequence counters let readers detect records overwritten before they were read.
+Publishing is one struct.pack_into per tick and does not depend on readers.
+
+Layout (little-endian):
+  header (64 B): magic 'BERT', version, capacity, record_size, write_seq (u64), session (u64),
+                 owner pid (u32)
+  ring:          capacity x RECORD_FIELDS records; record i holds seq i+1 at slot i % capacity
+
+Reader example:
+    from telemetry_tap import TelemetryReader
+    tap = TelemetryReader()
+    new = tap.read_new()            # structured array of records since the last call
+    new["torque_estimate_Nm"], tap.overruns
+
+Run `python telemetry_tap.py [--name NAME]` for a live console monitor.
+
+A backend never takes over a segment another backend is still using: an
+existing segment is only reclaimed when its owner process is gone and its
+write_seq does not advance. Run several backends with distinct
+`backend.py --tap-name` values.
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+DEFAULT_NAME = "berr_exo_telemetry"
+DEFAULT_CAPACITY = 1 << 16  # ~22 min at 50 Hz
+
+MAGIC = b"BERT"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIQQI")
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16
+STALE_CHECK_S = 0.5  # how long an existing segment's write_seq is watched before reclaiming it
+
+# (name, struct code) — shared by the struct writer and the NumPy reader dtype
+RECORD_FIELDS = [
+    ("seq", "Q"),
+    ("session", "I"),
+    ("active_errors", "I"),
+    ("time_s", "d"),
+    ("pos_turns", "d"),
+    ("pos_deg", "f"),
+    ("normalized", "f"),
+    ("velocity_turns_s", "f"),
+    ("curve_multiplier", "f"),
+    ("commanded_torque_Nm", "f"),
+    ("desired_torque_Nm", "f"),
+    ("torque_estimate_Nm", "f"),
+    ("input_iq_A", "f"),
+    ("motor_temp_C", "f"),
+    ("fet_temp_C", "f"),
+    ("vbus_V", "f"),
+    ("ibus_A", "f"),
+    ("power_elec_W", "f"),
+    ("power_mech_W", "f"),
+    ("tick_ms", "f"),
+    ("deadline_misses", "I"),
+]
+RECORD = struct.Struct("<" + "".join(code for _, code in RECORD_FIELDS))
+_DATA_FIELDS = [name for name, _ in RECORD_FIELDS[3:]]
+
+
+def record_dtype():
+    """NumPy dtype matching RECORD byte-for-byte."""
+    import numpy as np
+
+    np_codes = {"Q": "<u8", "I": "<u4", "d": "<f8", "f": "<f4"}
+    return np.dtype([(name, np_codes[code]) for name, code in RECORD_FIELDS])
+
+
+# ── Writer (backend side) ───────────────────────────────────────────────────
+
+class TelemetryTap:
+    """Owns the shared-memory ring and publishes one record per tick."""
+
+    def __init__(self, name: str = DEFAULT_NAME, capacity: int = DEFAULT_CAPACITY):
+        size = HEADER_SIZE + capacity * RECORD.size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            _reclaim_stale(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = name
+        self.capacity = capacity
+        self.seq = 0
+        self.session = 0
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, capacity, RECORD.size, 0, 0, os.getpid())
+
+    def new_session(self) -> None:
+        self.session += 1
+        struct.pack_into("<Q", self.shm.buf, WRITE_SEQ_OFFSET + 8, self.session)
+
+    def publish(self, errors: int = 0, **values: float) -> None:
+        """Write one tick. Missing channels are stored as NaN (counters as 0)."""
+        seq = self.seq + 1
+        data = [values.get(f, 0 if f == "deadline_misses" else float("nan")) for f in _DATA_FIELDS]
+        offset = HEADER_SIZE + ((seq - 1) % self.capacity) * RECORD.size
+        RECORD.pack_into(self.shm.buf, offset, seq, self.session, int(errors), *data)
+        # Publish the record only after it is fully written
+        struct.pack_into("<Q", self.shm.buf, WRITE_SEQ_OFFSET, seq)
+        self.seq = seq
+
+    def close(self) -> None:
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _pid_alive(pid: int) -> bool:
+    if sys.platform == "win32":
+        return True  # segments vanish with their last handle there, so an existing one is in use
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _reclaim_stale(name: str) -> None:
+    """Unlink a segment left behind by a crashed backend; FileExistsError if it is still live."""
+    shm = _attach(name)
+    try:
+        if len(shm.buf) >= HEADER.size:
+            magic, _, _, _, seq, _, pid = HEADER.unpack_from(shm.buf, 0)
+        else:
+            magic, seq, pid = b"", 0, 0
+        if magic == MAGIC and pid and _pid_alive(pid):
+            raise FileExistsError(f"telemetry tap '{name}' is in use by process {pid}")
+        time.sleep(STALE_CHECK_S)
+        if magic == MAGIC and struct.unpack_from("<Q", shm.buf, WRITE_SEQ_OFFSET)[0] != seq:
+            raise FileExistsError(f"telemetry tap '{name}' is being written by another process")
+    finally:
+        shm.close()
+    print(f"Reclaiming stale telemetry tap '{name}'")
+    shared_memory.SharedMemory(name=name).unlink()
+
+
+# ── Reader (analysis side) ──────────────────────────────────────────────────
+
+class TelemetryReader:
+    """Attach to a running tap; `records` is a zero-copy NumPy view of the ring."""
+
+    def __init__(self, name: str = DEFAULT_NAME, from_start: bool = False):
+        import numpy as np
+
+        self._np = np
+        self.shm = _attach(name)
+        magic, version, capacity, record_size, write_seq, _, _ = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.shm.close()
+            raise ValueError(f"Shared memory '{name}' is not a v{VERSION} BERR telemetry tap")
+        self.capacity = capacity
+        self.records = np.ndarray((capacity,), dtype=record_dtype(), buffer=self.shm.buf, offset=HEADER_SIZE)
+        self._header = np.ndarray((2,), dtype="<u8", buffer=self.shm.buf, offset=WRITE_SEQ_OFFSET)
+        self.cursor = max(0, write_seq - capacity) if from_start else write_seq
+        self.overruns = 0
+
+    @property
+    def write_seq(self) -> int:
+        return int(self._header[0])
+
+    @property
+    def session(self) -> int:
+        return int(self._header[1])
+
+    def read_new(self, copy: bool = True):
+        """Records published since the last call, oldest first.
+
+        Records lost to ring wrap-around (reader too slow) are added to
+        `overruns`. With copy=False a non-wrapping range is returned as a view
+        into shared memory; it is only valid until the writer laps it.
+        """
+        np = self._np
+        w = self.write_seq
+        start = max(self.cursor, w - self.capacity)
+        self.overruns += start - self.cursor
+        self.cursor = w
+        if w == start:
+            return self.records[:0]
+
+        lo, hi = (start % self.capacity), (w - 1) % self.capacity + 1
+        if lo < hi and not copy:
+            return self.records[lo:hi]
+        out = self.records[lo:hi].copy() if lo < hi else np.concatenate((self.records[lo:], self.records[:hi]))
+        # Slots the writer overwrote while we were copying carry a newer seq
+        valid = out["seq"] == np.arange(start + 1, w + 1, dtype=np.uint64)
+        if not valid.all():
+            self.overruns += int((~valid).sum())
+            out = out[valid]
+        return out
+
+    def latest(self, n: int):
+        """Copy of the most recent n records (n <= capacity), oldest first."""
+        w = self.write_seq
+        n = min(n, w, self.capacity)
+        idx = self._np.arange(w - n, w) % self.capacity
+        return self.records[idx]
+
+    def close(self) -> None:
+        self.records = None
+        self._header = None
+        self.shm.close()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach without letting this process's resource tracker unlink the segment on exit."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+# ── Console Monitor ─────────────────────────────────────────────────────────
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Live console monitor for the telemetry tap")
+    p.add_argument("--name", type=str, default=DEFAULT_NAME,
+                   help=f"Shared-memory segment name (default: {DEFAULT_NAME})")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    try:
+        tap = TelemetryReader(args.name)
+    except FileNotFoundError:
+        print(f"No telemetry tap '{args.name}' found. Is backend.py running?")
+        sys.exit(1)
+    print(f"Attached to {args.name} ({tap.capacity} records). Ctrl+C to exit.\n")
+    try:
+        while True:
+            time.sleep(1.0)
+            new = tap.read_new()
+            if len(new):
+                last = new[-1]
+                print(f"session={int(last['session'])}  {len(new):4d} rec/s  overruns={tap.overruns}  "
+                      f"t={last['time_s']:.1f}s  pos={last['pos_deg']:.1f}°  "
+                      f"τ={last['commanded_torque_Nm']:.2f}Nm  τ_est={last['torque_estimate_Nm']:.2f}Nm")
+            else:
+                print(f"idle  overruns={tap.overruns}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tap.close()
+
+
+if __name__ == "__main__":
+    main()
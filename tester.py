@@ -8,7 +8,6 @@ scaled by max_torque. Curves can be presets or loaded from a JSON file
 """
 
 import argparse
-import csv
 import json
 import math
 import sys
@@ -20,6 +19,8 @@ from typing import List, Optional
 import odrive
 from odrive.enums import AxisState, ControlMode, InputMode
 
+from session_log import TESTER_LOG_DIR, SessionLogWriter
+
 # ── Preset Curves ───────────────────────────────────────────────────────────
 # Each preset is 12 normalized values (0.0–1.0) at evenly spaced positions
 # through the ROM, matching the frontend EQ bar count.
@@ -159,6 +160,7 @@ def run(
     pos_range_deg: float = 120.0,
     dt: float = 0.02,
     direction: int = 1,
+    log_compression: Optional[str] = None,
 ) -> None:
     """Position-dependent torque control with curve lookup and CSV logging.
 
@@ -170,6 +172,8 @@ def run(
         dt: Control loop period in seconds.
         direction: 1 or -1, flips the curve for left/right arm or
                    concentric vs eccentric phase emphasis.
+        log_compression: None, "gzip" or "zstd" — stream the CSV through a
+                   compressor with periodic sync points.
     """
     odrv, axis = connect_axis()
 
@@ -203,13 +207,13 @@ def run(
     current_torque = 0.0
 
     # ── CSV setup ──
-    log_dir = Path("./logs")
-    log_dir.mkdir(exist_ok=True)
+    log_dir = TESTER_LOG_DIR
+    log_dir.mkdir(parents=True, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = log_dir / f"berr_exo_log_{timestamp}.csv"
+    writer = SessionLogWriter(log_dir / f"berr_exo_log_{timestamp}.csv", log_compression)
+    filename = writer.path
 
-    with open(filename, "w", newline="") as csvfile:
-        writer = csv.writer(csvfile)
+    try:
         writer.writerow([
             "time_s", "pos_turns", "pos_deg", "normalized",
             "velocity_turns_s", "curve_multiplier",
@@ -232,6 +236,7 @@ def run(
                 "pos_range_deg": pos_range_deg,
                 "direction": direction,
                 "dt_s": dt,
+                "transport": "usb",
                 "pos_start_turns": pos_start,
             }, mf, indent=2)
 
@@ -316,6 +321,8 @@ def run(
         finally:
             axis.controller.input_torque = 0
             axis.requested_state = AxisState.IDLE
+    finally:
+        writer.close()
 
     print(f"Done. Data → {filename}")
     print(f"Meta → {meta_file}")
@@ -342,6 +349,8 @@ def parse_args() -> argparse.Namespace:
                    help="Control loop period in seconds (default: 0.02)")
     p.add_argument("--direction", type=int, default=1, choices=[1, -1],
                    help="Curve direction: 1=normal, -1=reversed (default: 1)")
+    p.add_argument("--log-compression", type=str, default=None, choices=["gzip", "zstd"],
+                   help="Write the CSV log compressed (default: plain CSV)")
     return p.parse_args()
 
 
@@ -355,6 +364,7 @@ def main() -> None:
         pos_range_deg=args.range_deg,
         dt=args.dt,
         direction=args.direction,
+        log_compression=args.log_compression,
     )
 
 
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""BERR EXO — Online motor thermal model and torque budget.
+
+A lumped single-node model of the winding, updated every control tick:
+
+    C dT/dt = 1.5 R(T) iq² - (T - T_amb) / R_th,    R(T) = R_25 (1 + α_cu (T - 25))
+
+The model temperature is pulled toward the motor thermistor (a simple
+observer), so it tracks the measured temperature while still reacting to
+current before the thermistor does. Time-to-limit comes from the average
+copper power of the last POWER_WINDOW_S. The sustainable torque is the peak
+torque setting that keeps the winding below the limit for the rest of the
+planned session, given the duty pattern seen so far (copper power scales
+with torque squared).
+
+Heating is driven by the phase current inferred from the ODrive torque
+estimate (phase_current(): torque_estimate / torque_constant, itself computed
+by the ODrive from the measured Iq). input_iq is only the current setpoint
+input and reads 0 in torque control. Without a valid current signal, or
+before any copper power has been seen, the model never derates.
+
+budget() turns this into a smooth derate factor. backend.py multiplies the
+curve by it when the session enables `thermal_budget` (off by default: the
+default R_th / C_th are placeholders, not identified on the D6374), and the
+slew limiter ramps the change in.
+
+    python thermal_model.py logs/berr_exo_log_20260225_124133.csv   # model vs thermistor on a log
+"""
+
+import argparse
+import math
+from typing import Optional
+
+from session_log import add_session_args, select_sessions
+
+ALPHA_CU = 0.00393      # copper resistance tempco, 1/K
+POWER_WINDOW_S = 10.0   # averaging window for the duty-cycle power estimate
+MIN_REMAINING_S = 60.0  # budget at least this far ahead, even past the planned end
+DEFAULT_R_TH = 1.5      # K/W, placeholder until identified on the motor
+DEFAULT_C_TH = 200.0    # J/K, placeholder until identified on the motor
+
+
+def phase_current(torque_estimate: Optional[float], torque_constant: float) -> Optional[float]:
+    """Phase current (A) from the ODrive torque estimate; None without a usable signal."""
+    if torque_estimate is None or not math.isfinite(torque_estimate) or not torque_constant > 0:
+        return None
+    return torque_estimate / torque_constant
+
+
+class MotorThermalModel:
+    """Winding temperature estimate, time-to-limit and sustainable torque."""
+
+    def __init__(self, phase_resistance: float, torque_constant: float, limit_C: float = 100.0,
+                 ambient_C: float = 25.0, r_th: float = DEFAULT_R_TH, c_th: float = DEFAULT_C_TH,
+                 observer_gain: float = 0.2, derate_margin_C: float = 15.0):
+        self.r25 = phase_resistance
+        self.kt = torque_constant
+        self.limit = limit_C
+        self.ambient = ambient_C
+        self.r_th = r_th                  # K/W, winding to ambient
+        self.c_th = c_th                  # J/K
+        self.observer_gain = observer_gain  # 1/s pull toward the thermistor
+        self.margin = derate_margin_C     # derating starts this far below the limit
+        self.temp = ambient_C
+        self.power = 0.0                  # instantaneous copper power, W
+        self._power_ema = 0.0
+        self._duty_ema = 0.0              # copper W per Nm² of torque setting (usage pattern)
+        self._weight = 0.0                # EMA bias correction while the window fills
+        self._initialized = False
+        self.has_current = False          # a valid current sample has been seen
+
+    @property
+    def tau(self) -> float:
+        return self.r_th * self.c_th
+
+    @property
+    def power_avg(self) -> float:
+        """Copper power averaged over POWER_WINDOW_S, W."""
+        return self._power_ema / self._weight if self._weight > 0 else 0.0
+
+    def update(self, iq: Optional[float], measured_C: float, dt: float, setting: float) -> None:
+        """Advance the model by dt seconds at current iq (A, None if unknown) with torque setting `setting` (Nm)."""
+        measured_ok = measured_C is not None and math.isfinite(measured_C) and measured_C > -40
+        if not self._initialized:
+            if measured_ok:
+                self.temp = max(self.ambient, measured_C)
+            self._initialized = True
+        if dt <= 0:
+            return
+        if iq is None:
+            # No current signal: follow the thermistor only, and record no duty
+            self.power = 0.0
+            if measured_ok:
+                self.temp += min(1.0, self.observer_gain * dt) * (measured_C - self.temp)
+            return
+        self.has_current = True
+        r = self.r25 * (1 + ALPHA_CU * (self.temp - 25.0))
+        self.power = 1.5 * r * iq * iq
+        self.temp += dt * (self.power - (self.temp - self.ambient) / self.r_th) / self.c_th
+        if measured_ok:
+            self.temp += min(1.0, self.observer_gain * dt) * (measured_C - self.temp)
+        a = min(1.0, dt / POWER_WINDOW_S)
+        self._weight += a * (1.0 - self._weight)
+        self._power_ema += a * (self.power - self._power_ema)
+        if setting:
+            self._duty_ema += a * (self.power / (setting * setting) - self._duty_ema)
+
+    def time_to_limit(self, power: float = None) -> float:
+        """Seconds until the limit at `power` (default: the recent average); inf if never."""
+        p = self.power_avg if power is None else power
+        t_ss = self.ambient + p * self.r_th
+        if self.temp >= self.limit:
+            return 0.0
+        if t_ss <= self.limit:
+            return math.inf
+        return -self.tau * math.log((t_ss - self.limit) / (t_ss - self.temp))
+
+    def allowed_power(self, remaining_s: float) -> float:
+        """Constant copper power that lands exactly on the limit after remaining_s."""
+        decay = math.exp(-max(remaining_s, MIN_REMAINING_S) / self.tau)
+        t_ss = (self.limit - self.temp * decay) / (1 - decay)
+        return max(0.0, (t_ss - self.ambient) / self.r_th)
+
+    def sustainable_torque(self, remaining_s: float) -> float:
+        """Highest peak torque setting (Nm) that stays under the limit for remaining_s; inf without load history."""
+        duty = self._duty_ema / self._weight if self._weight > 0 else 0.0
+        if duty <= 1e-6:
+            return math.inf
+        # Same usage pattern, scaled: copper power ∝ torque²
+        return math.sqrt(self.allowed_power(remaining_s) / duty)
+
+    def budget(self, max_torque: float, remaining_s: float) -> float:
+        """Derate factor in [0, 1] for a session configured at |max_torque|; 1 without a current signal."""
+        if max_torque == 0 or not self.has_current:
+            return 1.0
+        factor = min(1.0, self.sustainable_torque(remaining_s) / abs(max_torque))
+        # Guard band for model error: fade to zero over the last `margin` degrees
+        factor = min(factor, (self.limit - self.temp) / self.margin)
+        return max(0.0, factor)
+
+
+def format_duration(seconds: float) -> str:
+    if math.isinf(seconds):
+        return "∞"
+    return f"{int(seconds // 60)}:{int(seconds % 60):02d}"
+
+
+# ── Offline Check ───────────────────────────────────────────────────────────
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="BERR EXO — Run the thermal model over logged sessions")
+    add_session_args(p)
+    p.add_argument("--phase-resistance", type=float, default=0.1,
+                   help="Phase resistance at 25 °C in ohms (default: 0.1)")
+    p.add_argument("--torque-constant", type=float, default=8.27 / 149,
+                   help="Torque constant in Nm/A (default: 8.27/149)")
+    p.add_argument("--r-th", type=float, default=DEFAULT_R_TH,
+                   help=f"Thermal resistance in K/W (default: {DEFAULT_R_TH}, uncalibrated)")
+    p.add_argument("--c-th", type=float, default=DEFAULT_C_TH,
+                   help=f"Thermal capacity in J/K (default: {DEFAULT_C_TH:.0f}, uncalibrated)")
+    p.add_argument("--open-loop", action="store_true",
+                   help="Ignore the thermistor after the first sample (tests the model alone)")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    sessions = select_sessions(args)
+    for s in sessions:
+        rows = s.read_rows()
+        if len(rows) < 2 or "torque_estimate_Nm" not in rows[0] or "motor_temp_C" not in rows[0]:
+            print(f"{s.name}: skipped (no torque estimate/temperature columns)")
+            continue
+        model = MotorThermalModel(args.phase_resistance, args.torque_constant,
+                                  r_th=args.r_th, c_th=args.c_th,
+                                  observer_gain=0.0 if args.open_loop else 0.2)
+        setting = abs(float((s.read_meta() or {}).get("max_torque_Nm", 0.0)))
+        t_prev, err2, worst = None, 0.0, 0.0
+        for r in rows:
+            t, temp = float(r["time_s"]), float(r["motor_temp_C"])
+            iq = phase_current(float(r["torque_estimate_Nm"]), args.torque_constant)
+            model.update(iq, temp, 0.0 if t_prev is None else t - t_prev, setting)
+            t_prev = t
+            err2 += (model.temp - temp) ** 2
+            worst = max(worst, abs(model.temp - temp))
+        print(f"{s.name}: {len(rows)} samples, end {model.temp:.1f} °C (thermistor {temp:.1f} °C), "
+              f"rms err {math.sqrt(err2 / len(rows)):.2f} K, max {worst:.2f} K, "
+              f"avg copper {model.power_avg:.1f} W, time-to-limit {format_duration(model.time_to_limit())}")
+
+
+if __name__ == "__main__":
+    main()